@@ -11,51 +11,205 @@ No classes!
 
 Functions list:
 
+- load_bundle_index(version: int) -> Union[dict, None]
+- index_bundle_directory(version: int) -> Union[dict, None]
+- clear_bundle_cache(version: int = None) -> None
+- get_bundle_index(version: int) -> Union[dict, None]
 - list_modules_in_bundle(version: int = None) -> list
-- get_module_path(version: int = None, name: str = None) -> Path:
+- get_bundle_path(version: int) -> Union[Path, None]
+- get_module_files(version: int, name: str) -> Union[dict, None]
+- build_import_resolver(index: dict) -> dict[str, str]
+- get_import_resolver(version: int) -> Union[dict[str, str], None]
+- resolve_import(version: int, name: str) -> Union[str, None]
+- resolve_dependencies(version: int, names: list[str]) -> list[str]
+- load_text_index(version: int) -> Union[dict, None]
+- get_text_index(version: int) -> Union[dict, None]
+- search_bundles(query: str, versions: list[int] = None) -> dict[int, list[str]]
 - authenticate_with_github(user_and_pass: dict = None,
                            access_token: str = None,
                            url_and_token: dict = None) -> Union[Github, None]
-- update_bundle(version: int = None) -> None
+- download_asset(url: str, path: Path, chunk_size: int = CHUNK_SIZE, etag: str = None,
+                 size: int = None) -> Union[dict, None]
+- load_download_cache() -> dict
+- save_download_cache(cache: dict) -> None
+- prune_download_cache(cache: dict) -> None
+- is_kept_member(name: str, keep: tuple[str, ...] = KEEP_DIRECTORIES) -> bool
+- extract_bundle(zip_path: Path, unzip_path: Path, keep: tuple[str, ...] = KEEP_DIRECTORIES,
+                 previous_lib_path: Path = None, previous_files: dict = None) -> int
+- prune_bundles(version: int, current: str = None) -> None
+- list_downloaded_versions() -> list[int]
+- build_bundle_index(zip_path: Path, generation: str) -> dict
+- write_bundle_index(version: int, index: dict) -> None
+- update_bundle_from_release(version: int, release: GitRelease, assets: list[GitReleaseAsset],
+                             progress: Callable[[int, str], None] = None,
+                             differential: bool = DIFFERENTIAL_UPDATE) -> Path
+- update_bundle(version: int = None, github_instance: Github = None, differential: bool = DIFFERENTIAL_UPDATE) -> Path
+- update_bundles(versions: list[int], github_instance: Github = None, max_workers: int = MAX_WORKERS,
+                 progress: Callable[[int, str], None] = None,
+                 differential: bool = DIFFERENTIAL_UPDATE) -> dict[int, Union[Path, Exception]]
 
 """
 
 from pathlib import Path
+import os
 from shutil import rmtree
 from github import Github
-import requests
+from github.GitRelease import GitRelease
+from github.GitReleaseAsset import GitReleaseAsset
 from zipfile import ZipFile
+from zlib import crc32
 from time import time as unix
-from typing import Union
+import json
+from typing import Union, Callable
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
+from bundle_tools import network, search, dependencies
 from bundle_tools.create_logger import create_logger
 import logging
 
 logger = create_logger(name=__name__, level=logging.DEBUG)
 
+# How many bytes to read from the network and write to disk at a time while downloading a bundle
+CHUNK_SIZE = 64 * 1024
+# The directories inside of a bundle zip that we extract - everything else (like examples) is skipped
+KEEP_DIRECTORIES = ("lib",)
+# How many bundles (and cached bundle zips) to keep around for each version
+KEEP_GENERATIONS = 2
+# Where downloaded bundle zips are cached by their SHA-256 hash, along with what we know about them
+DOWNLOAD_CACHE_PATH = Path.cwd() / "bundles_zip" / "cache.json"
+# The name of the index written next to the bundles of each version, so listing them doesn't walk the file system
+INDEX_NAME = "index.json"
+# The name of the full text search index written next to the bundle index. See "bundle_tools.search"
+TEXT_INDEX_NAME = "search_index.json"
+# Bundles are extracted into a directory starting with this, and renamed once they are complete
+STAGING_PREFIX = ".staging-"
+# How many versions to download and extract at the same time in "bundle_tools.bundle_manager.update_bundles()"
+MAX_WORKERS = 4
+# Whether to hard link unchanged files from the previous bundle when updating, instead of extracting everything again
+DIFFERENTIAL_UPDATE = True
+BUNDLE_REPO = "adafruit/Adafruit_CircuitPython_Bundle"
 
-def list_modules_in_bundle(version: int) -> Union[list[str], None]:
+# Updates of different versions run in parallel, so they must not read and write the download cache at the same time
+download_cache_lock = Lock()
+# The bundle indexes we have loaded, by version. See "bundle_tools.bundle_manager.get_bundle_index()"
+bundle_cache: dict[int, Union[dict, None]] = {}
+text_index_cache: dict[int, Union[dict, None]] = {}
+# The import resolvers we have built, by version, with the generation of the bundle they were built from
+resolver_cache: dict[int, tuple[str, dict[str, str]]] = {}
+bundle_cache_lock = Lock()
+# Pruning happens in the background, so don't let two prunes delete the same directories at the same time
+prune_lock = Lock()
+
+
+def load_bundle_index(version: int) -> Union[dict, None]:
     """
-    Lists the modules in the bundle stored internally.
+    Loads the index of the bundle stored internally, which is written by "bundle_tools.bundle_manager.update_bundle()".
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :return: A dictionary with the keys "generation", "bundle_name", "lib_path" and "modules", or None if there is no
+      index (for example, if no bundle was downloaded or it was downloaded by an older version of this program).
+    """
+    index_path = Path.cwd() / "bundles" / str(version) / INDEX_NAME
+    try:
+        return json.loads(index_path.read_text())
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        logger.debug(f"No bundle index found at {repr(index_path)}")
+        return None
+
+
+def index_bundle_directory(version: int) -> Union[dict, None]:
+    """
+    Builds and writes the index of a bundle that was downloaded before indexes existed by walking its lib directory.
+    This is slow but only ever happens once per bundle.
 
     :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
-    :return: A list of strings with the module name. Returns an empty list if no bundle was downloaded or None if it
-      couldn't find it.
+    :return: A dictionary, like the one returned by "bundle_tools.bundle_manager.build_bundle_index()", or None if no
+      bundle was downloaded.
     """
-    modules = []
     modules_path = Path.cwd() / "bundles" / str(version)
-    bundles = [str(path) for path in list(modules_path.glob("*"))]
+    bundles = [str(path) for path in list(modules_path.glob("*")) if path.is_dir() and not path.name.startswith(".")]
     bundles.sort()
     logger.debug(f"Modules found are {repr(bundles)}")
     try:
         bundles = bundles[-1:][0]
     except IndexError:
         return None
-    module_path = (list(Path(bundles).glob("*"))[0] / "lib")
-    logger.debug(f"Module path is {repr(module_path)}")
-    for module in module_path.glob("*"):
-        modules.append(module.name)
-    logger.debug(f"Modules found: {repr(modules)}")
-    return modules
+    bundle_path = (list(Path(bundles).glob("*"))[0] / "lib")
+    logger.debug(f"Indexing bundle at {repr(bundle_path)}...")
+    modules = {}
+    for module_path in sorted(bundle_path.glob("*")):
+        paths = sorted(path for path in module_path.rglob("*") if path.is_file()) if module_path.is_dir() else [module_path]
+        files = {
+            path.relative_to(bundle_path).as_posix(): {"size": path.stat().st_size, "crc": crc32(path.read_bytes())}
+            for path in paths
+        }
+        modules[module_path.name] = {
+            "type": "package" if module_path.is_dir() else "file",
+            "size": sum(file["size"] for file in files.values()),
+            "files": files
+        }
+    index = {
+        "generation": Path(bundles).name,
+        "bundle_name": bundle_path.parent.name,
+        "lib_path": bundle_path.relative_to(modules_path).as_posix(),
+        "modules": modules,
+        # The requirements directory was deleted from bundles this old, so we don't know their dependencies
+        "dependencies": {}
+    }
+    write_bundle_index(version, index)
+    return index
+
+
+def clear_bundle_cache(version: int = None) -> None:
+    """
+    Forgets the bundle indexes we have loaded into memory, so they are loaded from disk again next time.
+
+    :param version: An integer saying what version to forget, or None to forget all of them. Defaults to None.
+    :return: None.
+    """
+    logger.debug(f"Clearing bundle cache for {repr(version) if version is not None else 'all versions'}")
+    with bundle_cache_lock:
+        if version is None:
+            bundle_cache.clear()
+            text_index_cache.clear()
+            resolver_cache.clear()
+        else:
+            bundle_cache.pop(version, None)
+            text_index_cache.pop(version, None)
+            resolver_cache.pop(version, None)
+
+
+def get_bundle_index(version: int) -> Union[dict, None]:
+    """
+    Gets the index of the bundle stored internally. Indexes are kept in memory once loaded, and replaced when
+    "bundle_tools.bundle_manager.update_bundle()" writes a new bundle, so this only touches the disk the first time.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :return: A dictionary, like the one returned by "bundle_tools.bundle_manager.build_bundle_index()", or None if no
+      bundle was downloaded.
+    """
+    with bundle_cache_lock:
+        if version in bundle_cache:
+            return bundle_cache[version]
+    index = load_bundle_index(version)
+    if index is None:
+        index = index_bundle_directory(version)
+    with bundle_cache_lock:
+        bundle_cache[version] = index
+    return index
+
+
+def list_modules_in_bundle(version: int) -> Union[list[str], None]:
+    """
+    Lists the modules in the bundle stored internally.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :return: A sorted list of strings with the module name. Returns None if no bundle was downloaded.
+    """
+    index = get_bundle_index(version)
+    if index is None:
+        return None
+    return list(index["modules"])
 
 
 def get_bundle_path(version: int) -> Union[Path, None]:
@@ -65,19 +219,158 @@ def get_bundle_path(version: int) -> Union[Path, None]:
     :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
     :return: A pathlib.Path object pointing to the path of the bundle or None if we can't find it.
     """
-    modules_path = Path.cwd() / "bundles" / str(version)
-    bundles = [str(path) for path in list(modules_path.glob("*"))]
-    bundles.sort()
-    logger.debug(f"Modules found are {repr(bundles)}")
-    try:
-        bundles = bundles[-1:][0]
-    except IndexError:
+    index = get_bundle_index(version)
+    if index is None:
         return None
-    bundle_path = (list(Path(bundles).glob("*"))[0] / "lib")
+    bundle_path = Path.cwd() / "bundles" / str(version) / index["lib_path"]
     logger.debug(f"Bundle path is {repr(bundle_path)}")
     return bundle_path
 
 
+def get_module_files(version: int, name: str) -> Union[dict, None]:
+    """
+    Gets the sizes and CRC32s of the files of a module in the bundle stored internally.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :param name: A string with the name of the module in the bundle, like "adafruit_bus_device".
+    :return: A dictionary of paths relative to the lib directory to dictionaries with the keys "size" and "crc", or
+      None if the module (or the bundle) can't be found.
+    """
+    index = get_bundle_index(version)
+    if index is None or name not in index["modules"]:
+        return None
+    return index["modules"][name]["files"]
+
+
+def build_import_resolver(index: dict) -> dict[str, str]:
+    """
+    Builds a dictionary that maps what you would import to the module in the bundle it comes from, so finding the module
+    for an import is one lookup. Packages map their name and every submodule in them, single files map their name
+    without the extension.
+
+    :param index: A dictionary, as returned by "bundle_tools.bundle_manager.build_bundle_index()".
+    :return: A dictionary of import names (like "neopixel", "adafruit_display_text" or "adafruit_display_text.label")
+      to the names of the modules in the bundle (like "neopixel.mpy" or "adafruit_display_text").
+    """
+    resolver = {}
+    for name, module in index["modules"].items():
+        if module["type"] != "package":
+            # A package wins over a file with the same name, like the old lookups did
+            resolver.setdefault(name.rsplit(".", 1)[0], name)
+            continue
+        resolver[name] = name
+        for path in module["files"]:
+            parts = path.rsplit(".", 1)[0].split("/")
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            resolver[".".join(parts)] = name
+    logger.debug(f"Built import resolver with {len(resolver)} names for {len(index['modules'])} modules")
+    return resolver
+
+
+def get_import_resolver(version: int) -> Union[dict[str, str], None]:
+    """
+    Gets the import resolver of the bundle stored internally. It is built once for each bundle that is downloaded.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :return: A dictionary, as returned by "bundle_tools.bundle_manager.build_import_resolver()", or None if no bundle
+      was downloaded.
+    """
+    index = get_bundle_index(version)
+    if index is None:
+        return None
+    with bundle_cache_lock:
+        cached = resolver_cache.get(version)
+    if cached is not None and cached[0] == index["generation"]:
+        return cached[1]
+    resolver = build_import_resolver(index)
+    with bundle_cache_lock:
+        resolver_cache[version] = (index["generation"], resolver)
+    return resolver
+
+
+def resolve_import(version: int, name: str) -> Union[str, None]:
+    """
+    Gets the module in the bundle stored internally that an import comes from.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :param name: A string with the imported name, like "neopixel" or "adafruit_display_text.label".
+    :return: A string with the name of the module in the bundle, like "neopixel.mpy", or None if it isn't in the bundle.
+    """
+    resolver = get_import_resolver(version)
+    if resolver is None:
+        return None
+    if name in resolver:
+        return resolver[name]
+    # Like "from adafruit_display_text.label import Label" where only the package is known
+    return resolver.get(name.split(".")[0])
+
+
+def resolve_dependencies(version: int, names: list[str]) -> list[str]:
+    """
+    Gets every module needed to install some modules from the bundle stored internally.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :param names: A list of strings with the names of the modules in the bundle, like ["adafruit_display_text"].
+    :return: A list of strings with the names of the modules to install, with dependencies coming before the modules
+      that need them. If no bundle was downloaded, this is just the names passed in.
+    """
+    index = get_bundle_index(version)
+    graph = index.get("dependencies", {}) if index is not None else {}
+    return dependencies.resolve(graph, names)
+
+
+def load_text_index(version: int) -> Union[dict, None]:
+    """
+    Loads the full text search index of the bundle stored internally from the disk.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :return: A dictionary, as returned by "bundle_tools.search.build_text_index()", or None if there is none.
+    """
+    index_path = Path.cwd() / "bundles" / str(version) / TEXT_INDEX_NAME
+    try:
+        return json.loads(index_path.read_text())
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        logger.debug(f"No text index found at {repr(index_path)}")
+        return None
+
+
+def get_text_index(version: int) -> Union[dict, None]:
+    """
+    Gets the full text search index of the bundle stored internally. Like
+    "bundle_tools.bundle_manager.get_bundle_index()", this only touches the disk the first time.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :return: A dictionary, as returned by "bundle_tools.search.build_text_index()", or None if there is none.
+    """
+    with bundle_cache_lock:
+        if version in text_index_cache:
+            return text_index_cache[version]
+    text_index = load_text_index(version)
+    with bundle_cache_lock:
+        text_index_cache[version] = text_index
+    return text_index
+
+
+def search_bundles(query: str, versions: list[int] = None) -> dict[int, list[str]]:
+    """
+    Searches the module names, submodule names, docstrings and metadata of the bundles stored internally.
+
+    :param query: A string with the search query, like "bme280" or "neopixel".
+    :param versions: A list of integers with the versions to search, or None to search every downloaded version.
+      Defaults to None.
+    :return: A dictionary of versions to lists of strings with the names of the modules that matched.
+    """
+    if versions is None:
+        versions = list_downloaded_versions()
+    results = {}
+    for version in versions:
+        text_index = get_text_index(version)
+        results[version] = search.search_text(query, text_index) if text_index is not None else []
+    logger.debug(f"Full text results for {repr(query)}: {repr(results)}")
+    return results
+
+
 def authenticate_with_github(user_and_pass: dict = None,
                              access_token: str = None,
                              url_and_token: dict = None) -> Union[Github, None]:
@@ -125,55 +418,396 @@ def authenticate_with_github(user_and_pass: dict = None,
     return None
 
 
-def update_bundle(version: int = None, github_instance: Github = None) -> Path:
+def download_asset(url: str, path: Path, chunk_size: int = CHUNK_SIZE, etag: str = None,
+                   size: int = None) -> Union[dict, None]:
     """
-    Updates the bundle for the given version.
+    Streams a file from the internet to disk in chunks, so the whole file is never held in memory. The data is written
+    to a ".part" file next to the path and renamed into place once it has been completely downloaded. If a previous
+    download broke, the ".part" file is resumed instead of starting again.
 
-    :param version:  An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
-    :param github_instance: An instance of github.Github. Get this from
-      "bundle_tools.bundle_manager.authenticate_with_github()".
+    :param url: A string that points to the file to download.
+    :param path: A pathlib.Path object that points to where to download.
+    :param chunk_size: An integer with how many bytes to read at a time. Defaults to CHUNK_SIZE.
+    :param etag: A string with the ETag of a copy we already have. If the server says it hasn't changed, nothing is
+      downloaded. Defaults to None.
+    :param size: An integer with how many bytes the file should be, like the size GitHub lists for a release asset. A
+      download of any other size is thrown away. Defaults to None.
+    :return: A dictionary with the keys "path", "etag", "sha256" and "size", or None if the server said the file has
+      not been modified since the ETag we passed in.
+    :raises ValueError: If the download isn't the size it should be.
+    """
+    part_path = path.with_name(path.name + ".part")
+    logger.debug(f"Downloading {repr(url)} to {repr(part_path)} in chunks of {chunk_size} bytes...")
+    result = network.stream_to_file(url, part_path, chunk_size=chunk_size,
+                                    headers={"If-None-Match": etag} if etag else None, hash_name="sha256")
+    if result is None:
+        logger.debug(f"{repr(url)} has not been modified since ETag {repr(etag)}")
+        part_path.unlink(missing_ok=True)
+        return None
+    if size is not None and result["size"] != size:
+        logger.error(f"Downloaded {result['size']} bytes from {repr(url)}, but it should be {size} bytes!")
+        part_path.unlink(missing_ok=True)
+        raise ValueError(f"Downloaded {result['size']} bytes from {url}, but it should be {size} bytes!")
+    part_path.replace(path)
+    logger.debug(f"Downloaded {result['size']} bytes to {repr(path)}")
+    return {"path": path, "etag": result["headers"].get("ETag"), "sha256": result["digest"], "size": result["size"]}
+
+
+def load_download_cache() -> dict:
+    """
+    Loads the download cache, which remembers what we last downloaded for each version.
+
+    :return: A dictionary of version strings to dictionaries with the keys "tag", "asset_id", "etag", "size",
+      "sha256", "bundle_name", "unzip_name" and "zips". Returns an empty dictionary if there is no cache.
+    """
+    try:
+        return json.loads(DOWNLOAD_CACHE_PATH.read_text())
+    except (FileNotFoundError, json.decoder.JSONDecodeError):
+        return {}
+
+
+def save_download_cache(cache: dict) -> None:
+    """
+    Saves the download cache. The file is replaced atomically so a crash never leaves half of it behind.
+
+    :param cache: A dictionary, as returned by "bundle_tools.bundle_manager.load_download_cache()".
+    :return: None.
+    """
+    DOWNLOAD_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = DOWNLOAD_CACHE_PATH.with_name(DOWNLOAD_CACHE_PATH.name + ".tmp")
+    temp_path.write_text(json.dumps(cache, sort_keys=True, indent=4))
+    temp_path.replace(DOWNLOAD_CACHE_PATH)
+
+
+def prune_download_cache(cache: dict) -> None:
+    """
+    Deletes the cached bundle zips that no version refers to anymore. A zip that is being downloaded or extracted isn't
+    referred to yet, so only call this once every update is done, like "bundle_tools.bundle_manager.update_bundle()"
+    and "bundle_tools.bundle_manager.update_bundles()" do.
+
+    :param cache: A dictionary, as returned by "bundle_tools.bundle_manager.load_download_cache()".
+    :return: None.
+    """
+    referenced = {f"{digest}.zip" for record in cache.values() for digest in record.get("zips", [])}
+    for path in DOWNLOAD_CACHE_PATH.parent.glob("*.zip"):
+        if path.name not in referenced:
+            logger.debug(f"Deleting unreferenced cached zip {repr(path)}...")
+            path.unlink(missing_ok=True)
+
+
+def is_kept_member(name: str, keep: tuple[str, ...] = KEEP_DIRECTORIES) -> bool:
+    """
+    Whether a member of a bundle zip should be extracted. Bundle zips have a single top level directory (ex.
+    "adafruit-circuitpython-bundle-6.x-mpy-20201217/") with "lib", "examples" and "requirements" inside it. Files
+    directly in the top level directory (like "VERSIONS.txt") are metadata and are always kept.
+
+    :param name: A string with the name of the member, as in zipfile.ZipInfo.filename.
+    :param keep: A tuple of strings with the directories to keep. Defaults to KEEP_DIRECTORIES.
+    :return: A bool telling whether to extract the member or not.
+    """
+    parts = name.split("/")
+    if len(parts) <= 2:
+        return True
+    return parts[1] in keep
+
+
+def extract_bundle(zip_path: Path, unzip_path: Path, keep: tuple[str, ...] = KEEP_DIRECTORIES,
+                   previous_lib_path: Path = None, previous_files: dict = None) -> int:
+    """
+    Extracts a bundle zip, but only writes the members inside the directories we want to keep.
+
+    If the lib directory of the previous bundle and its files are passed in, files in lib whose size and CRC32 (as
+    stored in the zip's central directory) haven't changed are hard linked from the previous bundle instead of being
+    written again. Hard links that fail (for example, on file systems that don't support them) fall back to extracting.
+
+    :param zip_path: A pathlib.Path object pointing to the bundle zip.
+    :param unzip_path: A pathlib.Path object pointing to where to extract the bundle.
+    :param keep: A tuple of strings with the directories to keep. Defaults to KEEP_DIRECTORIES.
+    :param previous_lib_path: A pathlib.Path object pointing to the lib directory of the previous bundle. Defaults to
+      None.
+    :param previous_files: A dictionary of file paths relative to the previous lib directory to dictionaries with the
+      keys "size" and "crc", like in the modules of a bundle index. Defaults to None.
+    :return: An integer with the number of members written. (Not counting the ones that were linked)
+    """
+    written = 0
+    linked = 0
+    with ZipFile(zip_path, "r") as zip_file:
+        members = [info for info in zip_file.infolist() if is_kept_member(info.filename, keep)]
+        logger.debug(f"Extracting {len(members)} of {len(zip_file.infolist())} members from {repr(zip_path)}...")
+        for info in members:
+            parts = info.filename.split("/")
+            if previous_lib_path is not None and previous_files is not None and not info.is_dir() and \
+                    len(parts) > 2 and parts[1] == "lib":
+                relative_path = "/".join(parts[2:])
+                previous = previous_files.get(relative_path)
+                if previous is not None and previous["size"] == info.file_size and previous["crc"] == info.CRC:
+                    destination = unzip_path.joinpath(*parts)
+                    destination.parent.mkdir(parents=True, exist_ok=True)
+                    try:
+                        os.link(previous_lib_path / relative_path, destination)
+                        linked += 1
+                        continue
+                    except OSError:
+                        logger.debug(f"Could not link {repr(relative_path)}, extracting it instead")
+            zip_file.extract(info, unzip_path)
+            written += 1
+    logger.debug(f"Wrote {written} members and linked {linked} unchanged files from {repr(previous_lib_path)}")
+    return written
+
+
+def prune_bundles(version: int, current: str = None) -> None:
+    """
+    Deletes the old bundles of a version, keeping the newest KEEP_GENERATIONS, and anything left in a staging directory
+    by an update that didn't finish. "bundle_tools.bundle_manager.update_bundle()" runs this in the background.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :param current: A string with the name of the current bundle, which is never deleted. Defaults to None.
+    :return: None.
+    """
+    bundles_path = Path.cwd() / "bundles" / str(version)
+    with prune_lock:
+        bundles = []
+        for path in bundles_path.glob("*"):
+            if not path.is_dir():
+                continue
+            if path.name.startswith(STAGING_PREFIX):
+                if path.name[len(STAGING_PREFIX):] < (current or ""):
+                    logger.debug(f"Deleting abandoned staging directory {repr(path)}...")
+                    rmtree(path, ignore_errors=True)
+            else:
+                bundles.append(path)
+        bundles.sort()
+        logger.debug(f"Found {len(bundles)} bundles!")
+        for path in bundles[:-KEEP_GENERATIONS]:
+            if path.name == current:
+                continue
+            logger.debug(f"Deleting {repr(path)}...")
+            rmtree(path, ignore_errors=True)
+
+
+def list_downloaded_versions() -> list[int]:
+    """
+    Lists the versions that we have downloaded a bundle for.
+
+    :return: A sorted list of integers, like [6, 7] if we have bundles for CircuitPython 6.x and 7.x.
+    """
+    bundles_path = Path.cwd() / "bundles"
+    versions = [int(path.name) for path in bundles_path.glob("*") if path.name.isdigit() and any(path.glob("*"))]
+    versions.sort()
+    logger.debug(f"Downloaded versions: {repr(versions)}")
+    return versions
+
+
+def build_bundle_index(zip_path: Path, generation: str) -> dict:
+    """
+    Builds the index of a bundle from the central directory of its zip, so we don't have to walk the extracted files.
+
+    :param zip_path: A pathlib.Path object pointing to the bundle zip.
+    :param generation: A string with the name of the directory the bundle was extracted to, like "1608213643.5342305".
+    :return: A dictionary with the keys "generation", "bundle_name", "lib_path", "modules" and "dependencies".
+      "modules" maps the name of each module (as shown in the lib directory, like "adafruit_bus_device" or
+      "neopixel.mpy") to a dictionary with the keys "type" ("package" or "file"), "size" and "files", which maps the
+      path of every file relative to the lib directory to a dictionary with the keys "size" and "crc" (the CRC32 stored
+      in the zip). "dependencies" is the graph from "bundle_tools.dependencies.build_dependency_graph()".
+    """
+    modules = {}
+    bundle_name = None
+    with ZipFile(zip_path, "r") as zip_file:
+        for info in zip_file.infolist():
+            parts = info.filename.split("/")
+            bundle_name = parts[0]
+            if len(parts) < 3 or parts[1] != "lib" or parts[2] == "" or info.is_dir():
+                continue
+            module = modules.setdefault(parts[2], {"type": "package" if len(parts) > 3 else "file", "size": 0, "files": {}})
+            module["size"] += info.file_size
+            module["files"]["/".join(parts[2:])] = {"size": info.file_size, "crc": info.CRC}
+        graph = dependencies.build_dependency_graph(zip_file, bundle_name, modules)
+    logger.debug(f"Indexed {len(modules)} modules from {repr(zip_path)}")
+    return {
+        "generation": generation,
+        "bundle_name": bundle_name,
+        "lib_path": f"{generation}/{bundle_name}/lib",
+        "modules": dict(sorted(modules.items())),
+        "dependencies": graph
+    }
+
+
+def write_bundle_index(version: int, index: dict) -> None:
+    """
+    Writes the index of the bundle stored internally. The file is replaced atomically so readers never see half of it.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :param index: A dictionary, as returned by "bundle_tools.bundle_manager.build_bundle_index()".
+    :return: None.
+    """
+    index_path = Path.cwd() / "bundles" / str(version) / INDEX_NAME
+    temp_path = index_path.with_name(index_path.name + ".tmp")
+    temp_path.write_text(json.dumps(index))
+    temp_path.replace(index_path)
+    logger.debug(f"Wrote bundle index to {repr(index_path)}")
+
+
+def update_bundle_from_release(version: int, release: GitRelease, assets: list[GitReleaseAsset],
+                               progress: Callable[[int, str], None] = None,
+                               differential: bool = DIFFERENTIAL_UPDATE) -> Path:
+    """
+    Updates the bundle for the given version from a release we already looked up.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :param release: The github.GitRelease.GitRelease to update from.
+    :param assets: A list of the github.GitReleaseAsset.GitReleaseAsset in the release.
+    :param progress: A function that gets called with the version and a string describing what we are doing. Defaults
+      to None.
+    :param differential: A bool telling whether to link the files that haven't changed from the previous bundle
+      instead of writing them again. Defaults to DIFFERENTIAL_UPDATE.
     :return: A pathlib.Path object that contains the path of the bundle.
     """
-    logger.info(f"Updating bundle...")
-    assets = github_instance.get_repo("adafruit/Adafruit_CircuitPython_Bundle").get_latest_release().get_assets()
-    logger.debug(f"Assets found: {repr(assets)}")
+    def report(status: str) -> None:
+        logger.debug(f"Version {version}: {status}")
+        if progress is not None:
+            progress(version, status)
+
     name = f"adafruit-circuitpython-bundle-{version}.x-mpy"
-    bundle_url = None
-    bundle_name = None
+    bundle_asset = None
     for asset in assets:
         if name in asset.name:
-            bundle_url = asset.browser_download_url
-            bundle_name = asset.name
-            logger.debug(f"Found bundle! Name: {repr(bundle_name)} URL: {repr(bundle_url)}")
+            bundle_asset = asset
+            logger.debug(f"Found bundle! Name: {repr(asset.name)} URL: {repr(asset.browser_download_url)}")
             break
-    download_path = Path.cwd() / "bundles_zip" / str(version) / bundle_name
-    download_path.parent.mkdir(parents=True, exist_ok=True)
-    logger.debug(f"Download path is {repr(download_path)}")
-    with download_path.open(mode="wb") as file:
-        logger.debug(f"Downloading {repr(bundle_url)}...")
-        response = requests.get(bundle_url)
-        file.write(response.content)
-    unzip_path = Path.cwd() / "bundles" / str(version) / str(unix())
-    unzip_path.parent.mkdir(parents=True, exist_ok=True)
-    logger.debug(f"Unzip path is {repr(unzip_path)}")
-    with ZipFile(download_path, "r") as zip_file:
-        logger.debug(f"Extracting {repr(download_path)}...")
-        zip_file.extractall(unzip_path)
-    logger.debug(f"Deleting {repr(download_path.parent)}...")
-    rmtree(download_path.parent)
-    logger.debug(f"Found {len(list(unzip_path.parent.glob('*')))} bundles!")
-    while len(list(unzip_path.parent.glob("*"))) > 2:
-        bundles = list(unzip_path.parent.glob("*"))
-        bundles.sort()
-        logger.debug(f"Deleting {repr(bundles[0])}...")
-        rmtree(bundles[0])
+    if bundle_asset is None:
+        logger.error(f"Could not find a bundle for version {version}!")
+        raise ValueError(f"Could not find a bundle for version {version}!")
+    bundle_name = bundle_asset.name
+    record = load_download_cache().get(str(version), {})
+    bundles_path = Path.cwd() / "bundles" / str(version)
+    cached_zip = DOWNLOAD_CACHE_PATH.parent / f"{record.get('sha256')}.zip"
+    unchanged = (record.get("tag") == release.tag_name and record.get("asset_id") == bundle_asset.id and
+                 record.get("size") == bundle_asset.size)
+    if unchanged and (bundles_path / record["unzip_name"] / bundle_name[:-4] / "lib").exists():
+        lib_path = bundles_path / record["unzip_name"] / bundle_name[:-4] / "lib"
+        logger.info(f"Bundle {repr(release.tag_name)} is already up to date at {repr(lib_path)}!")
+        if load_bundle_index(version) is None and cached_zip.exists():
+            write_bundle_index(version, build_bundle_index(cached_zip, record["unzip_name"]))
+            clear_bundle_cache(version)
+        report("Already up to date")
+        return lib_path
+    if unchanged and cached_zip.exists():
+        logger.debug(f"Bundle {repr(release.tag_name)} is cached, skipping download!")
+        downloaded = None
+    else:
+        download_path = DOWNLOAD_CACHE_PATH.parent / bundle_name
+        logger.debug(f"Download path is {repr(download_path)}")
+        report("Downloading")
+        downloaded = download_asset(bundle_asset.browser_download_url, download_path,
+                                    etag=record.get("etag") if cached_zip.exists() else None, size=bundle_asset.size)
+    if downloaded is not None:
+        cached_zip = DOWNLOAD_CACHE_PATH.parent / f"{downloaded['sha256']}.zip"
+        download_path.replace(cached_zip)
+        record = {
+            "etag": downloaded["etag"], "size": downloaded["size"], "sha256": downloaded["sha256"],
+            "zips": [digest for digest in record.get("zips", []) if digest != downloaded["sha256"]] + [downloaded["sha256"]]
+        }
+        record["zips"] = record["zips"][-KEEP_GENERATIONS:]
+    record.update({"tag": release.tag_name, "asset_id": bundle_asset.id, "bundle_name": bundle_name})
+    logger.debug(f"Cached zip is {repr(cached_zip)}")
+    generation = str(unix())
+    unzip_path = bundles_path / generation
+    # Extract somewhere that readers never look, and only move it into place once it is complete
+    staging_path = bundles_path / f"{STAGING_PREFIX}{generation}"
+    staging_path.mkdir(parents=True, exist_ok=True)
+    logger.debug(f"Staging path is {repr(staging_path)}, unzip path is {repr(unzip_path)}")
+    report("Extracting")
+    previous_index = get_bundle_index(version) if differential else None
+    if previous_index is not None and previous_index.get("generation") != generation:
+        extract_bundle(cached_zip, staging_path, previous_lib_path=bundles_path / previous_index["lib_path"],
+                       previous_files={path: file for module in previous_index["modules"].values()
+                                       for path, file in module["files"].items()})
+    else:
+        extract_bundle(cached_zip, staging_path)
+    record["unzip_name"] = generation
+    index = build_bundle_index(cached_zip, generation)
+    report("Indexing")
+    text_index = search.build_text_index(cached_zip, index, previous=load_text_index(version))
+    staging_path.replace(unzip_path)
+    text_index_path = bundles_path / TEXT_INDEX_NAME
+    text_index_path.with_name(TEXT_INDEX_NAME + ".tmp").write_text(json.dumps(text_index))
+    text_index_path.with_name(TEXT_INDEX_NAME + ".tmp").replace(text_index_path)
+    # Replacing the index is what makes the new bundle the current one
+    write_bundle_index(version, index)
+    with bundle_cache_lock:
+        bundle_cache[version] = index
+        text_index_cache[version] = text_index
+    with download_cache_lock:
+        cache = load_download_cache()
+        cache[str(version)] = record
+        save_download_cache(cache)
+    Thread(target=prune_bundles, args=(version, generation), daemon=True).start()
     lib_path = unzip_path / bundle_name[:-4] / "lib"
-    examples_path = unzip_path / bundle_name[:-4] / "examples"
-    logger.debug(f"Removing {repr(examples_path)}")
-    rmtree(examples_path, ignore_errors=True)
-    requirements_path = unzip_path / bundle_name[:-4] / "requirements"
-    logger.debug(f"Removing {repr(requirements_path)}")
-    rmtree(requirements_path, ignore_errors=True)
     logger.debug(f"Path to latest bundle is {repr(lib_path)}")
+    report("Done")
+    return lib_path
+
+
+def update_bundle(version: int = None, github_instance: Github = None, differential: bool = DIFFERENTIAL_UPDATE) -> Path:
+    """
+    Updates the bundle for the given version.
+
+    :param version:  An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :param github_instance: An instance of github.Github. Get this from
+      "bundle_tools.bundle_manager.authenticate_with_github()".
+    :param differential: A bool telling whether to link the files that haven't changed from the previous bundle
+      instead of writing them again. Defaults to DIFFERENTIAL_UPDATE.
+    :return: A pathlib.Path object that contains the path of the bundle.
+    """
+    logger.info(f"Updating bundle...")
+    release = github_instance.get_repo(BUNDLE_REPO).get_latest_release()
+    assets = list(release.get_assets())
+    logger.debug(f"Assets found: {repr(assets)}")
+    lib_path = update_bundle_from_release(version, release, assets, differential=differential)
+    with download_cache_lock:
+        prune_download_cache(load_download_cache())
     logger.info(f"Finished updating bundle!")
     return lib_path
+
+
+def update_bundles(versions: list[int], github_instance: Github = None, max_workers: int = MAX_WORKERS,
+                   progress: Callable[[int, str], None] = None,
+                   differential: bool = DIFFERENTIAL_UPDATE) -> dict[int, Union[Path, Exception]]:
+    """
+    Updates the bundles for many versions at once. The latest release is only looked up once, and then the bundles are
+    downloaded and extracted in parallel.
+
+    :param versions: A list of integers with the versions we want, like [7, 8, 9].
+    :param github_instance: An instance of github.Github. Get this from
+      "bundle_tools.bundle_manager.authenticate_with_github()".
+    :param max_workers: An integer with how many versions to update at the same time. Defaults to MAX_WORKERS.
+    :param progress: A function that gets called with the version and a string describing what we are doing. It is
+      called from the worker threads. Defaults to None.
+    :param differential: A bool telling whether to link the files that haven't changed from the previous bundle
+      instead of writing them again. Defaults to DIFFERENTIAL_UPDATE.
+    :return: A dictionary of versions to either a pathlib.Path object that contains the path of the bundle, or the
+      exception that was raised while updating that version.
+    """
+    logger.info(f"Updating bundles for versions {repr(versions)}...")
+    release = github_instance.get_repo(BUNDLE_REPO).get_latest_release()
+    assets = list(release.get_assets())
+    logger.debug(f"Assets found: {repr(assets)}")
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(versions)))) as executor:
+        futures = {
+            version: executor.submit(update_bundle_from_release, version, release, assets, progress, differential)
+            for version in versions
+        }
+        for version, future in futures.items():
+            try:
+                results[version] = future.result()
+            except Exception as e:
+                logger.exception(f"Failed to update bundle for version {version}!")
+                if progress is not None:
+                    progress(version, "Failed")
+                results[version] = e
+    # Only now that every worker is done, so no zip that is still being extracted or indexed is deleted
+    with download_cache_lock:
+        prune_download_cache(load_download_cache())
+    logger.info(f"Finished updating bundles!")
+    return results
@@ -0,0 +1,134 @@
+"""
+A module that knows which modules are built into CircuitPython (or frozen into it on some boards), so they don't have to
+be installed from the bundle.
+
+-----------
+
+Classes list:
+
+No classes!
+
+-----------
+
+Functions list:
+
+- read_boot_out(device_drive: Path) -> tuple[Union[int, None], Union[str, None]]
+- get_core_modules(version: int, board_id: str = None) -> frozenset[str]
+- filter_core_modules(names: list[str], version: int, board_id: str = None) -> list[str]
+
+"""
+
+from pathlib import Path
+from typing import Union
+from threading import Lock
+import re
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# Like "Adafruit CircuitPython 7.3.3 on 2022-08-29; Adafruit Feather M4 Express with samd51j19" and
+# "Board ID:feather_m4_express"
+VERSION_PATTERN = re.compile(r"CircuitPython (\d+)\.")
+BOARD_ID_PATTERN = re.compile(r"Board ID:\s*(\S+)")
+
+# The modules added to (and removed from) the core in each major version of CircuitPython. Modules that are built in on
+# some boards but come from the bundle on others (like adafruit_bus_device since 7.x) are left out, so they are still
+# installed when needed.
+ADDED_MODULES = {
+    4: "array binascii builtins collections errno gc io json math micropython os random re struct sys time "
+       "analogio audiobusio audioio bitbangio board busio digitalio displayio fontio gamepad i2cslave microcontroller "
+       "neopixel_write network nvm pulseio rotaryio rtc socket storage supervisor terminalio touchio uheap usb_hid "
+       "usb_midi ustack",
+    5: "_bleio _pixelbuf audiocore audiomixer audiomp3 audiopwmio framebufferio frequencyio gamepadshift ps2io "
+       "rgbmatrix sdcardio sdioio ulab vectorio",
+    6: "alarm bitmaptools camera canio countio dualbank espidf imagecapture ipaddress memorymonitor msgpack pwmio "
+       "sharpdisplay socketpool ssl watchdog wifi",
+    7: "atexit i2cperipheral keypad onewireio qrio rainbowio select traceback usb_cdc",
+    8: "espcamera getpass gifio hashlib i2ctarget mdns paralleldisplay synthio zlib",
+    9: "busdisplay epaperdisplay fourwire i2cdisplaybus"
+}
+REMOVED_MODULES = {
+    7: "_pixelbuf i2cslave",
+    8: "gamepad gamepadshift i2cperipheral network socket"
+}
+# The libraries frozen into the firmware of some boards, by the board ID in boot_out.txt
+FROZEN_MODULES = {
+    "circuitplayground_express": "adafruit_bus_device adafruit_circuitplayground adafruit_hid adafruit_lis3dh "
+                                 "adafruit_thermistor neopixel",
+    "circuitplayground_express_crickit": "adafruit_bus_device adafruit_circuitplayground adafruit_crickit "
+                                         "adafruit_lis3dh adafruit_motor adafruit_seesaw adafruit_thermistor neopixel",
+    "circuitplayground_express_displayio": "adafruit_bus_device adafruit_circuitplayground adafruit_lis3dh "
+                                           "adafruit_thermistor neopixel",
+    "feather_m0_express_crickit": "adafruit_bus_device adafruit_crickit adafruit_motor adafruit_seesaw neopixel",
+    "hallowing_m0_express": "adafruit_bus_device adafruit_lis3dh neopixel",
+    "pewpew10": "pew",
+    "ugame10": "stage ugame"
+}
+
+# The core modules of each version and board we already worked out
+core_module_cache: dict[tuple[int, Union[str, None]], frozenset[str]] = {}
+core_module_cache_lock = Lock()
+
+
+def read_boot_out(device_drive: Path) -> tuple[Union[int, None], Union[str, None]]:
+    """
+    Reads the CircuitPython version and board ID from the boot_out.txt file on a device.
+
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :return: A tuple of an integer with the major CircuitPython version (like 7) and a string with the board ID (like
+      "feather_m4_express"). Either one is None if it couldn't be found, like for old versions that don't write the
+      board ID.
+    """
+    try:
+        text = (device_drive / "boot_out.txt").read_text(errors="replace")
+    except OSError:
+        logger.debug(f"Could not read boot_out.txt on {repr(device_drive)}")
+        return None, None
+    version_match = VERSION_PATTERN.search(text)
+    board_match = BOARD_ID_PATTERN.search(text)
+    version = int(version_match.group(1)) if version_match else None
+    board_id = board_match.group(1) if board_match else None
+    logger.debug(f"{repr(device_drive)} runs CircuitPython {version} on board {board_id}")
+    return version, board_id
+
+
+def get_core_modules(version: int, board_id: str = None) -> frozenset[str]:
+    """
+    Gets the modules that are built into (or frozen into) a version of CircuitPython, so checking a name is one set
+    lookup. Versions older or newer than the ones known use the closest known version.
+
+    :param version: An integer with the major CircuitPython version, like 7.
+    :param board_id: A string with the board ID, like "circuitplayground_express", to add the modules frozen into that
+      board. Defaults to None.
+    :return: A frozenset of strings with the top level names of the modules.
+    """
+    key = (version, board_id)
+    with core_module_cache_lock:
+        if key in core_module_cache:
+            return core_module_cache[key]
+    names = set()
+    for known_version in sorted(ADDED_MODULES):
+        if known_version > version and names:
+            break
+        names |= set(ADDED_MODULES[known_version].split())
+        names -= set(REMOVED_MODULES.get(known_version, "").split())
+    names |= set(FROZEN_MODULES.get(board_id, "").split())
+    core = frozenset(names)
+    with core_module_cache_lock:
+        core_module_cache[key] = core
+    logger.debug(f"{len(core)} core modules for CircuitPython {version} on board {board_id}")
+    return core
+
+
+def filter_core_modules(names: list[str], version: int, board_id: str = None) -> list[str]:
+    """
+    Leaves out the modules built into CircuitPython from a list of imports.
+
+    :param names: A list of strings with the imported names.
+    :param version: An integer with the major CircuitPython version, like 7.
+    :param board_id: A string with the board ID. Defaults to None.
+    :return: A list of strings with the names that aren't built in, in the same order.
+    """
+    core = get_core_modules(version, board_id)
+    return [name for name in names if name.split(".")[0] not in core]
@@ -0,0 +1,150 @@
+"""
+A module that works out which modules in a bundle depend on which.
+
+-----------
+
+Classes list:
+
+No classes!
+
+-----------
+
+Functions list:
+
+- normalize_distribution_name(name: str) -> str
+- parse_requirements(text: str) -> list[str]
+- module_for_directory(directory: str, modules: dict) -> Union[str, None]
+- build_dependency_graph(zip_file: ZipFile, bundle_name: str, modules: dict) -> dict[str, list[str]]
+- resolve(graph: dict[str, list[str]], names: list[str]) -> list[str]
+
+"""
+
+from zipfile import ZipFile
+from typing import Union
+import re
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# Matches the name of the package in a pyproject.toml, like name = "adafruit-circuitpython-busdevice"
+PYPROJECT_NAME_PATTERN = re.compile(r"""^\s*name\s*=\s*["']([^"']+)["']""", re.MULTILINE)
+# Everything in a requirement after the name, like version specifiers, extras and markers
+REQUIREMENT_SPLIT_PATTERN = re.compile(r"[\s<>=!~;\[(@]")
+DISTRIBUTION_PREFIXES = ("adafruit-circuitpython-", "circuitpython-")
+
+
+def normalize_distribution_name(name: str) -> str:
+    """
+    Normalizes the name of a PyPI distribution so different spellings compare equal.
+
+    :param name: A string, like "Adafruit_CircuitPython_BusDevice".
+    :return: A string, like "adafruit-circuitpython-busdevice".
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def parse_requirements(text: str) -> list[str]:
+    """
+    Gets the names of the distributions in a requirements.txt.
+
+    :param text: A string with the contents of the requirements.txt.
+    :return: A list of strings with the normalized distribution names.
+    """
+    names = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line == "" or line.startswith("-"):
+            continue
+        names.append(normalize_distribution_name(REQUIREMENT_SPLIT_PATTERN.split(line, 1)[0]))
+    return names
+
+
+def module_for_directory(directory: str, modules: dict) -> Union[str, None]:
+    """
+    Gets the name of the module in the lib directory that a directory in the requirements directory is for.
+
+    :param directory: A string with the name of the directory, like "neopixel".
+    :param modules: A dictionary whose keys are the names of the modules in the lib directory.
+    :return: A string, like "neopixel.mpy", or None if there is no such module.
+    """
+    for candidate in (directory, f"{directory}.mpy", f"{directory}.py"):
+        if candidate in modules:
+            return candidate
+    return None
+
+
+def build_dependency_graph(zip_file: ZipFile, bundle_name: str, modules: dict) -> dict[str, list[str]]:
+    """
+    Builds the dependency graph of a bundle from the requirements directory in its zip, without extracting it.
+    Requirements that aren't in the bundle (like Adafruit-Blinka, which is only for CPython) are left out.
+
+    :param zip_file: The zipfile.ZipFile of the bundle.
+    :param bundle_name: A string with the name of the top level directory in the zip.
+    :param modules: A dictionary whose keys are the names of the modules in the lib directory.
+    :return: A dictionary of module names to lists of the module names they need, like
+      {"adafruit_bme280": ["adafruit_bus_device"]}.
+    """
+    prefix = f"{bundle_name}/requirements/"
+    requirements = {}
+    distributions = {}
+    for info in zip_file.infolist():
+        if not info.filename.startswith(prefix) or info.is_dir():
+            continue
+        parts = info.filename[len(prefix):].split("/")
+        if len(parts) != 2:
+            continue
+        module = module_for_directory(parts[0], modules)
+        if module is None:
+            continue
+        if parts[1] == "requirements.txt":
+            requirements[module] = parse_requirements(zip_file.read(info).decode("utf-8", errors="replace"))
+        elif parts[1] == "pyproject.toml":
+            match = PYPROJECT_NAME_PATTERN.search(zip_file.read(info).decode("utf-8", errors="replace"))
+            if match is not None:
+                distributions[normalize_distribution_name(match.group(1))] = module
+    # Older bundles don't ship a pyproject.toml, so guess the distribution name from the module name too
+    for module in modules:
+        stem = module.rsplit(".", 1)[0] if module.endswith((".mpy", ".py")) else module
+        short_name = normalize_distribution_name(stem.removeprefix("adafruit_"))
+        for distribution_prefix in DISTRIBUTION_PREFIXES:
+            distributions.setdefault(distribution_prefix + short_name, module)
+        distributions.setdefault(normalize_distribution_name(stem), module)
+    graph = {}
+    for module, names in requirements.items():
+        needed = []
+        for name in names:
+            dependency = distributions.get(name)
+            if dependency is None:
+                logger.debug(f"{repr(module)} needs {repr(name)}, which isn't in the bundle")
+            elif dependency != module and dependency not in needed:
+                needed.append(dependency)
+        if needed:
+            graph[module] = needed
+    logger.debug(f"Found dependencies for {len(graph)} modules")
+    return dict(sorted(graph.items()))
+
+
+def resolve(graph: dict[str, list[str]], names: list[str]) -> list[str]:
+    """
+    Gets every module needed to install some modules, with dependencies coming before the modules that need them.
+
+    :param graph: A dictionary, as returned by "bundle_tools.dependencies.build_dependency_graph()".
+    :param names: A list of strings with the names of the modules to install.
+    :return: A list of strings with the names of the modules to install, including all their dependencies.
+    """
+    order = []
+    visited = set()
+
+    def visit(name: str) -> None:
+        if name in visited:
+            return
+        visited.add(name)
+        for dependency in graph.get(name, []):
+            visit(dependency)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    logger.debug(f"Resolved {repr(names)} to {repr(order)}")
+    return order
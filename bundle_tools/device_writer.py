@@ -0,0 +1,432 @@
+"""
+A module that writes files to a CircuitPython device in one burst, so the board auto-reloads as few times as possible.
+
+-----------
+
+Classes list:
+
+- NotEnoughSpace(OSError)
+
+-----------
+
+Functions list:
+
+- cluster_size(path: Path) -> int
+- allocated_size(size: int, cluster: int) -> int
+- space_needed(writes: list[tuple[Path, Path]], freed: list[Path] = None, cluster: int = DEFAULT_CLUSTER_SIZE) -> int
+- check_free_space(device_path: Path, writes: list[tuple[Path, Path]], freed: list[Path] = None) -> int
+- fit_groups(groups: dict[str, list[tuple[Path, Path]]], device_path: Path, freed: list[Path] = None) -> list[str]
+- write_order(destination: Path) -> tuple[int, int, str]
+- stage_files(writes: list[tuple[Path, Path]]) -> list[tuple[Path, bytes]]
+- sync_files(paths: list[Path]) -> None
+- temp_path(path: Path) -> Path
+- device_lock(device_path: Path) -> RLock
+- write_journal(device_path: Path, journal: dict) -> None
+- remove_journal(device_path: Path) -> None
+- commit(device_path: Path, journal: dict) -> None
+- recover(device_path: Path) -> Union[str, None]
+- recover_journal(device_path: Path) -> Union[str, None]
+- write_files(device_path: Path, writes: list[tuple[Path, Path]], deletes: list[Path] = None,
+              buffer_size: int = WRITE_BUFFER_SIZE) -> list[Path]
+- remove_paths(device_path: Path, paths: list[Path]) -> None
+
+"""
+
+from pathlib import Path
+import os
+import shutil
+import json
+from threading import Lock, RLock
+from typing import Union
+from bundle_tools import os_detect
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# How big the write buffer is. Bigger than almost every file in the bundle, so each file is written in one go
+WRITE_BUFFER_SIZE = 1024 * 1024
+# Files that CircuitPython runs when a package (or the board) is imported or started
+ENTRY_FILE_STEMS = ("__init__", "code", "main", "boot")
+# The cluster size to assume if the OS won't tell us. CIRCUITPY drives are formatted with 512 byte clusters
+DEFAULT_CLUSTER_SIZE = 512
+# The journal of the batch being written, kept in the lib directory. Hidden, so it isn't listed as a module
+JOURNAL_NAME = ".bundle-manager-journal.json"
+# Files are written to a hidden name ending in this first, and renamed into place once everything is written
+TEMP_SUFFIX = ".bundle-manager-tmp"
+WRITING = "writing"
+COMMITTING = "committing"
+REMOVING = "removing"
+
+# Every batch on a device shares its journal, so only one batch may run on each device at a time. By resolved lib path
+device_locks: dict[Path, RLock] = {}
+device_locks_lock = Lock()
+
+
+class NotEnoughSpace(OSError):
+    """There isn't enough free space on the device for the files to write."""
+    def __init__(self, needed: int, free: int):
+        super().__init__(f"Not enough space on the device! Need {needed} bytes, but only {free} bytes are free.")
+        self.needed = needed
+        self.free = free
+
+
+def cluster_size(path: Path) -> int:
+    """
+    Gets the size of a cluster on the drive a path is on. Every file takes up a whole number of clusters, so a 100 byte
+    file really takes 512 bytes on most CIRCUITPY drives.
+
+    :param path: A pathlib.Path object that points to somewhere on the drive.
+    :return: An integer with the cluster size in bytes, or DEFAULT_CLUSTER_SIZE if it couldn't be found.
+    """
+    try:
+        if os_detect.on_windows():
+            import ctypes
+            sectors_per_cluster = ctypes.c_ulong()
+            bytes_per_sector = ctypes.c_ulong()
+            if ctypes.windll.kernel32.GetDiskFreeSpaceW(ctypes.c_wchar_p(path.drive + "\\"), ctypes.byref(sectors_per_cluster),
+                                                        ctypes.byref(bytes_per_sector), None, None):
+                return sectors_per_cluster.value * bytes_per_sector.value
+        else:
+            stats = os.statvfs(path)
+            return stats.f_frsize or stats.f_bsize
+    except (OSError, AttributeError):
+        logger.exception(f"Could not get the cluster size of {repr(path)}!")
+    return DEFAULT_CLUSTER_SIZE
+
+
+def allocated_size(size: int, cluster: int) -> int:
+    """
+    Rounds the size of a file up to the space it takes up on the drive.
+
+    :param size: An integer with the size of the file in bytes.
+    :param cluster: An integer with the cluster size in bytes.
+    :return: An integer.
+    """
+    return -(-size // cluster) * cluster
+
+
+def space_needed(writes: list[tuple[Path, Path]], freed: list[Path] = None, cluster: int = DEFAULT_CLUSTER_SIZE) -> int:
+    """
+    Works out the most space on the drive writing some files will take at once. Files are written next to the files
+    they replace before those are removed (see "bundle_tools.device_writer.write_files()"), so the new files count in
+    full, plus a cluster for every new directory.
+
+    :param writes: A list of tuples of the pathlib.Path object of the file to copy and the pathlib.Path object of where
+      to write it.
+    :param freed: A list of pathlib.Path objects of files that are deleted before writing. Defaults to None.
+    :param cluster: An integer with the cluster size in bytes. Defaults to DEFAULT_CLUSTER_SIZE.
+    :return: An integer with the bytes needed, which can be negative if space will be freed.
+    """
+    needed = 0
+    new_directories = set()
+    for source, destination in writes:
+        needed += allocated_size(source.stat().st_size, cluster)
+        for directory in destination.parents:
+            if directory.exists():
+                break
+            new_directories.add(directory)
+    for path in freed or []:
+        if path.is_file():
+            needed -= allocated_size(path.stat().st_size, cluster)
+    return needed + len(new_directories) * cluster
+
+
+def check_free_space(device_path: Path, writes: list[tuple[Path, Path]], freed: list[Path] = None) -> int:
+    """
+    Makes sure some files fit on the drive before anything is written, so we never leave half of a module behind.
+
+    :param device_path: A pathlib.Path object that points to somewhere on the drive, like the lib directory.
+    :param writes: A list of tuples of the pathlib.Path object of the file to copy and the pathlib.Path object of where
+      to write it.
+    :param freed: A list of pathlib.Path objects of files that are deleted before writing. Defaults to None.
+    :return: An integer with the bytes needed.
+    """
+    cluster = cluster_size(device_path)
+    # The journal takes a cluster too
+    needed = space_needed(writes, freed, cluster) + cluster
+    free = shutil.disk_usage(device_path).free
+    logger.debug(f"Need {needed} bytes on {repr(device_path)}, {free} bytes are free")
+    if needed > free:
+        logger.error(f"Not enough space on {repr(device_path)}! Need {needed} bytes, only {free} bytes are free")
+        raise NotEnoughSpace(needed, free)
+    return needed
+
+
+def fit_groups(groups: dict[str, list[tuple[Path, Path]]], device_path: Path, freed: list[Path] = None) -> list[str]:
+    """
+    Works out which groups of files (like the files of each module to install) fit on the drive, dropping groups from
+    the end until the rest fit.
+
+    :param groups: A dictionary of names to lists of the files to write, like the writes passed to
+      "bundle_tools.device_writer.space_needed()", in the order they should be kept.
+    :param device_path: A pathlib.Path object that points to somewhere on the drive, like the lib directory.
+    :param freed: A list of pathlib.Path objects of other files that will be deleted first. Defaults to None.
+    :return: A list of strings with the names of the groups that fit.
+    """
+    cluster = cluster_size(device_path)
+    available = shutil.disk_usage(device_path).free - space_needed([], freed, cluster) - cluster
+    needed = {name: space_needed(writes, None, cluster) for name, writes in groups.items()}
+    kept = list(needed)
+    while kept and sum(needed[name] for name in kept) > available:
+        kept.pop()
+    logger.debug(f"{len(kept)} of {len(needed)} groups fit on {repr(device_path)}")
+    return kept
+
+
+def write_order(destination: Path) -> tuple[int, int, str]:
+    """
+    Gets the key to sort the files to write by. Entry files (like __init__.mpy) are written after the rest of their
+    package, deepest packages first, so the board never loads a new entry file that imports a submodule that isn't
+    there yet.
+
+    :param destination: A pathlib.Path object that points to where the file will be written.
+    :return: A tuple that sorts files that should be written first first.
+    """
+    is_entry = destination.stem in ENTRY_FILE_STEMS
+    return int(is_entry), -len(destination.parts) if is_entry else 0, destination.as_posix()
+
+
+def stage_files(writes: list[tuple[Path, Path]]) -> list[tuple[Path, bytes]]:
+    """
+    Reads every file to write into memory and puts them in the order to write them, so writing to the device isn't
+    held up by reading from the disk.
+
+    :param writes: A list of tuples of the pathlib.Path object of the file to copy and the pathlib.Path object of where
+      to write it.
+    :return: A list of tuples of the pathlib.Path object of where to write and the bytes to write, in order.
+    """
+    staged = [(destination, source.read_bytes()) for source, destination in writes]
+    staged.sort(key=lambda item: write_order(item[0]))
+    logger.debug(f"Staged {len(staged)} files ({sum(len(data) for _, data in staged)} bytes)")
+    return staged
+
+
+def sync_files(paths: list[Path]) -> None:
+    """
+    Makes sure everything written to the device is actually on it. Uses one os.sync() where there is one, otherwise
+    (on Windows) flushes each file.
+
+    :param paths: A list of pathlib.Path objects of the files that were written.
+    :return: None.
+    """
+    if hasattr(os, "sync"):
+        os.sync()
+        return
+    for path in paths:
+        with path.open(mode="ab") as file:
+            os.fsync(file.fileno())
+
+
+def temp_path(path: Path) -> Path:
+    """
+    Gets the hidden name a file or directory has while it is being written or removed. Hidden files aren't imported by
+    CircuitPython or listed as modules.
+
+    :param path: A pathlib.Path object.
+    :return: A pathlib.Path object, like ".../.neopixel.mpy.bundle-manager-tmp".
+    """
+    return path.with_name(f".{path.name}{TEMP_SUFFIX}")
+
+
+def device_lock(device_path: Path) -> RLock:
+    """
+    Gets the lock that has to be held while a batch runs on a device, so one batch never recovers (and rolls back)
+    another batch that is still running. It can be held again by the same thread, so a whole plan can be run under it.
+
+    :param device_path: A pathlib.Path object that points to the lib directory of the device.
+    :return: A threading.RLock object.
+    """
+    key = device_path.resolve()
+    with device_locks_lock:
+        if key not in device_locks:
+            device_locks[key] = RLock()
+        return device_locks[key]
+
+
+def write_journal(device_path: Path, journal: dict) -> None:
+    """
+    Writes the journal of the batch being written. It is written to a temporary name and renamed into place, so it is
+    never half written.
+
+    :param device_path: A pathlib.Path object that points to the lib directory of the device.
+    :param journal: A dictionary with the key "state" (WRITING, COMMITTING or REMOVING) and the lists "writes",
+      "deletes", "removes" and "directories" (the directories the batch made) with paths relative to the lib directory.
+    :return: None.
+    """
+    journal_path = device_path / JOURNAL_NAME
+    temp = temp_path(journal_path)
+    temp.write_text(json.dumps(journal))
+    os.replace(temp, journal_path)
+    logger.debug(f"Journal of {repr(device_path)} is now {journal['state']}")
+
+
+def remove_journal(device_path: Path) -> None:
+    """
+    Removes the journal once a batch is done.
+
+    :param device_path: A pathlib.Path object that points to the lib directory of the device.
+    :return: None.
+    """
+    (device_path / JOURNAL_NAME).unlink(missing_ok=True)
+    temp_path(device_path / JOURNAL_NAME).unlink(missing_ok=True)
+
+
+def commit(device_path: Path, journal: dict) -> None:
+    """
+    Renames the written files into place (in the order they were written), deletes the files that don't belong
+    anymore and deletes the removed files and directories. Safe to run again if it was interrupted.
+
+    :param device_path: A pathlib.Path object that points to the lib directory of the device.
+    :param journal: A dictionary, see "bundle_tools.device_writer.write_journal()".
+    :return: None.
+    """
+    for relative_path in journal["writes"]:
+        destination = device_path / relative_path
+        if temp_path(destination).exists():
+            os.replace(temp_path(destination), destination)
+    for relative_path in journal["deletes"]:
+        (device_path / relative_path).unlink(missing_ok=True)
+    for relative_path in journal["removes"]:
+        # The original is only still there if we were interrupted before renaming it
+        for path in (temp_path(device_path / relative_path), device_path / relative_path):
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
+
+
+def recover(device_path: Path) -> Union[str, None]:
+    """
+    Finishes or undoes a batch that was interrupted (like by the board resetting or being unplugged), going by its
+    journal. A batch that was still writing is rolled back, since the files it replaces haven't been touched yet. A
+    batch that was renaming files into place or removing modules is finished. Waits for a batch that is running on
+    the device to finish first.
+
+    :param device_path: A pathlib.Path object that points to the lib directory of the device.
+    :return: "rolled back" or "resumed" if there was an interrupted batch, otherwise None.
+    """
+    with device_lock(device_path):
+        return recover_journal(device_path)
+
+
+def recover_journal(device_path: Path) -> Union[str, None]:
+    """
+    Does the work of "bundle_tools.device_writer.recover()". The lock of the device must be held.
+
+    :param device_path: A pathlib.Path object that points to the lib directory of the device.
+    :return: "rolled back" or "resumed" if there was an interrupted batch, otherwise None.
+    """
+    journal_path = device_path / JOURNAL_NAME
+    if not journal_path.exists():
+        return None
+    try:
+        journal = json.loads(journal_path.read_text())
+    except (json.decoder.JSONDecodeError, UnicodeDecodeError):
+        logger.exception(f"The journal of {repr(device_path)} is unreadable!")
+        remove_journal(device_path)
+        return None
+    if journal["state"] == WRITING:
+        logger.warning(f"Rolling back an interrupted batch on {repr(device_path)}")
+        for relative_path in journal["writes"]:
+            temp_path(device_path / relative_path).unlink(missing_ok=True)
+        # Deepest first, so a new package with new subpackages goes away entirely
+        for relative_path in reversed(journal.get("directories", [])):
+            try:
+                (device_path / relative_path).rmdir()
+            except OSError:
+                logger.warning(f"Could not remove {repr(device_path / relative_path)}, it isn't empty")
+        result = "rolled back"
+    else:
+        logger.warning(f"Resuming an interrupted batch on {repr(device_path)}")
+        commit(device_path, journal)
+        result = "resumed"
+    sync_files([])
+    remove_journal(device_path)
+    return result
+
+
+def write_files(device_path: Path, writes: list[tuple[Path, Path]], deletes: list[Path] = None,
+                buffer_size: int = WRITE_BUFFER_SIZE) -> list[Path]:
+    """
+    Copies files to the device in one burst: the free space is checked (see
+    "bundle_tools.device_writer.check_free_space()"), everything is read, the directories are made, the files are written
+    to hidden temporary names with large buffered writes and synced, and then they are renamed into place (entry files
+    last) and the files that don't belong anymore are deleted. A journal is kept the whole time, so if this is
+    interrupted "bundle_tools.device_writer.recover()" can roll it back or finish it. Only one batch runs on a device
+    at a time, see "bundle_tools.device_writer.device_lock()".
+
+    :param device_path: A pathlib.Path object that points to the lib directory of the device, where the journal is kept.
+    :param writes: A list of tuples of the pathlib.Path object of the file to copy and the pathlib.Path object of where
+      to write it.
+    :param deletes: A list of pathlib.Path objects of files to delete from the device. Defaults to None.
+    :param buffer_size: An integer with how big the write buffer is. Defaults to WRITE_BUFFER_SIZE.
+    :return: A list of pathlib.Path objects with the files that were written.
+    :raises NotEnoughSpace: If the files don't fit on the drive. Nothing is written.
+    """
+    with device_lock(device_path):
+        recover_journal(device_path)
+        if not writes and not deletes:
+            return []
+        if writes:
+            check_free_space(device_path, writes)
+        staged = stage_files(writes)
+        # Made shallowest first, and recorded so rolling back removes them too
+        directories = []
+        for destination, _ in staged:
+            for directory in reversed(destination.parents):
+                if directory not in directories and not directory.exists():
+                    directories.append(directory)
+        directories.sort(key=lambda path: len(path.parts))
+        journal = {
+            "state": WRITING,
+            "writes": [destination.relative_to(device_path).as_posix() for destination, _ in staged],
+            "deletes": [path.relative_to(device_path).as_posix() for path in deletes or []],
+            "removes": [],
+            "directories": [directory.relative_to(device_path).as_posix() for directory in directories]
+        }
+        write_journal(device_path, journal)
+        for directory in directories:
+            directory.mkdir(exist_ok=True)
+        written = []
+        for destination, data in staged:
+            logger.debug(f"Writing {repr(destination)}...")
+            with temp_path(destination).open(mode="wb", buffering=buffer_size) as file:
+                file.write(data)
+            written.append(destination)
+        sync_files([temp_path(destination) for destination in written])
+        journal["state"] = COMMITTING
+        write_journal(device_path, journal)
+        commit(device_path, journal)
+        sync_files(written)
+        remove_journal(device_path)
+    logger.debug(f"Wrote {len(written)} files and deleted {len(deletes or [])} files")
+    return written
+
+
+def remove_paths(device_path: Path, paths: list[Path]) -> None:
+    """
+    Removes files and directories (like modules) from the device. Each one is renamed to a hidden name first, so a
+    module is either all there or gone, and then deleted. A journal is kept, so if this is interrupted
+    "bundle_tools.device_writer.recover()" finishes it.
+
+    :param device_path: A pathlib.Path object that points to the lib directory of the device, where the journal is kept.
+    :param paths: A list of pathlib.Path objects to remove.
+    :return: None.
+    """
+    with device_lock(device_path):
+        recover_journal(device_path)
+        journal = {
+            "state": REMOVING,
+            "writes": [],
+            "deletes": [],
+            "removes": [path.relative_to(device_path).as_posix() for path in paths],
+            "directories": []
+        }
+        write_journal(device_path, journal)
+        for path in paths:
+            logger.debug(f"Removing {repr(path)}...")
+            os.replace(path, temp_path(path))
+        commit(device_path, journal)
+        sync_files([])
+        remove_journal(device_path)
@@ -0,0 +1,58 @@
+"""
+A module that provisions CircuitPython devices, like a table of boards for a workshop. Every device is planned at the
+same time, so the changes to each one can be shown before anything is written.
+
+-----------
+
+Classes list:
+
+No classes!
+
+-----------
+
+Functions list:
+
+- plan_drives(drives: list[Path], wanted: dict, remove_extra: bool = False) -> dict[Path, Union[dict, Exception]]
+
+"""
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+from bundle_tools import manifest
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# The most devices to read from or write to at the same time. Each device gets its own worker, because they each have
+# their own USB connection and don't slow each other down much
+MAX_WORKERS = 32
+
+
+def plan_drives(drives: list[Path], wanted: dict, remove_extra: bool = False) -> dict[Path, Union[dict, Exception]]:
+    """
+    Plans making every device have the modules in a manifest, only writing what is different. Each device is planned on
+    its own worker. This reads the devices, so run it in the background.
+
+    :param drives: A list of pathlib.Path objects that point to the devices. Example: ["I:", "J:"] on Windows.
+    :param wanted: A dictionary like a manifest, see "bundle_tools.manifest.load_manifest()". To install or upgrade
+      some modules, pass in just those modules.
+    :param remove_extra: A bool telling whether to remove modules in the bundle that aren't in the manifest. Defaults to
+      False.
+    :return: A dictionary of each device to its plan (see "bundle_tools.manifest.plan_and_fit()"), or to the exception
+      that was raised while planning it.
+    """
+    if not drives:
+        return {}
+    logger.debug(f"Planning {repr(drives)} with {repr(wanted)}")
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(drives))) as executor:
+        futures = {drive: executor.submit(manifest.plan_and_fit, wanted, drive, remove_extra) for drive in drives}
+    plans = {}
+    for drive, future in futures.items():
+        try:
+            plans[drive] = future.result()
+        except Exception as e:
+            logger.exception(f"Failed to plan {repr(drive)}!")
+            plans[drive] = e
+    return plans
@@ -11,44 +11,265 @@ No classes!
 
 Functions list:
 
-- get_imported(code: str) -> list[str]:
+- parse_imported(code: str) -> tuple[list[str], list[str]]
+- tokenize_imported(code: str) -> tuple[list[str], list[str]]
+- get_imported(code: str) -> tuple[list[str], list[str]]
+- get_imported_from_file(path: Path) -> tuple[list[str], list[str]]
+- list_project_files(device_drive: Path) -> list[Path]
+- local_module_names(path: Path, device_drive: Path) -> list[str]
+- scan_project(device_drive: Path, entry_points: list[Path] = None,
+               max_workers: int = MAX_WORKERS) -> tuple[list[str], list[Path]]
 
 """
 
+from pathlib import Path
+from io import StringIO
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor
+import tokenize
+import hashlib
+import ast
 from bundle_tools.create_logger import create_logger
 import logging
 
 logger = create_logger(name=__name__, level=logging.DEBUG)
 
+# How many pieces of code to remember the imports of
+CACHE_SIZE = 128
+# How many files to read and parse at the same time
+MAX_WORKERS = 4
 
-def get_imported(code: str) -> tuple[list[str], list[str]]:
+# The imports of code we already looked at, by the SHA256 of the code
+import_cache: dict[str, tuple[list[str], list[str]]] = {}
+import_cache_lock = Lock()
+# The imports of files we already looked at, by path, with the modification time and size they had
+file_cache: dict[Path, tuple[int, int, tuple[list[str], list[str]]]] = {}
+file_cache_lock = Lock()
+
+
+def parse_imported(code: str) -> tuple[list[str], list[str]]:
     """
-    Gets the imported modules from Python code.
+    Gets the imported modules from Python code by parsing it, so "import a, b", imports in parentheses or spread over
+    many lines and imports inside of functions are all found, and "import" inside of strings isn't. Relative imports
+    (like "from . import x") are left out, since they aren't modules you can install.
 
     :param code: The code as a string.
-    :return: A tuple of a list of strings with the modules imported. The first list is the module name, the second list
-      is the line that the imported module was imported.
+    :return: A tuple of two lists of strings, the modules imported and the import statements they were imported in.
+    :raises SyntaxError: If the code can't be parsed.
     """
+    tree = ast.parse(code)
+    nodes = sorted((node for node in ast.walk(tree) if isinstance(node, (ast.Import, ast.ImportFrom))),
+                   key=lambda node: (node.lineno, node.col_offset))
     modules = []
     module_lines = []
-    lines = code.splitlines()
-    logger.debug(f"Found {len(lines)} lines in the code!")
-    for line in lines:
-        line = line.strip()
-        while "  " in line:
-            line = line.replace("  ", " ")
-        line = line.replace(",", "")
-        parts = [part.strip() for part in line.split(sep=" ")]
-        if parts[0] in ("import", "from"):
-            logger.debug(f"Parts in import line: {repr(parts)}")
-            if parts[0] == "import":
-                if parts[1] not in modules:
-                    modules.append(parts[1])
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif node.level == 0 and node.module is not None:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            if name not in modules:
+                modules.append(name)
+        module_lines.append(" ".join((ast.get_source_segment(code, node) or "").split()))
+    return modules, module_lines
+
+
+def tokenize_imported(code: str) -> tuple[list[str], list[str]]:
+    """
+    Gets the imported modules from Python code that doesn't parse (like code that is still being written) by going
+    through its tokens, so strings and comments are still skipped. Stops at the first place it can't tokenize.
+
+    :param code: The code as a string.
+    :return: A tuple of two lists of strings, the modules imported and the import statements they were imported in.
+    """
+    modules = []
+    module_lines = []
+    statement = []
+    at_start = True
+    try:
+        for token in tokenize.generate_tokens(StringIO(code).readline):
+            if token.type in (tokenize.NEWLINE, tokenize.ENDMARKER) or token.string == ";":
+                if statement:
+                    names = []
+                    if statement[0].string == "import":
+                        # Like "import a.b as c, d", so split on commas and leave out what comes after "as"
+                        name = []
+                        aliased = False
+                        for part in statement[1:] + [None]:
+                            if part is None or part.string == ",":
+                                names.append("".join(name))
+                                name = []
+                                aliased = False
+                            elif part.string == "as":
+                                aliased = True
+                            elif not aliased and part.string not in ("(", ")"):
+                                name.append(part.string)
+                    elif len(statement) > 1 and statement[1].string != ".":
+                        # Like "from a.b import c", relative imports (from . import c) are left out
+                        name = []
+                        for part in statement[1:]:
+                            if part.string == "import":
+                                break
+                            name.append(part.string)
+                        names.append("".join(name))
+                    for name in names:
+                        if name and name not in modules:
+                            modules.append(name)
+                    if names:
+                        module_lines.append(" ".join(token.string for token in statement))
+                statement = []
+                at_start = True
+            elif token.type in (tokenize.NL, tokenize.COMMENT):
+                continue
+            elif token.type in (tokenize.INDENT, tokenize.DEDENT):
+                at_start = True
+            elif statement or (at_start and token.type == tokenize.NAME and token.string in ("import", "from")):
+                statement.append(token)
             else:
-                module = parts[1]
-                if module not in modules:
-                    modules.append(module)
-            module_lines.append(line)
+                # "from" only starts an import at the start of a statement, not in "raise x from y"
+                at_start = token.string == ":"
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        logger.debug("Stopped tokenizing at an error")
+    return modules, module_lines
+
+
+def get_imported(code: str) -> tuple[list[str], list[str]]:
+    """
+    Gets the imported modules from Python code. Code that was looked at before isn't parsed again.
+
+    :param code: The code as a string.
+    :return: A tuple of a list of strings with the modules imported. The first list is the module name, the second list
+      is the line that the imported module was imported.
+    """
+    key = hashlib.sha256(code.encode("utf-8", errors="surrogatepass")).hexdigest()
+    with import_cache_lock:
+        if key in import_cache:
+            modules, module_lines = import_cache[key]
+            logger.debug(f"Imports of the code are cached: {repr(modules)}")
+            return list(modules), list(module_lines)
+    try:
+        modules, module_lines = parse_imported(code)
+    except (SyntaxError, ValueError):
+        logger.debug("Code doesn't parse, falling back to tokenizing")
+        modules, module_lines = tokenize_imported(code)
     logger.debug(f"Modules imported in the code: {repr(modules)}")
     logger.debug(f"Lines: {repr(module_lines)}")
-    return modules, module_lines
+    with import_cache_lock:
+        import_cache[key] = (modules, module_lines)
+        while len(import_cache) > CACHE_SIZE:
+            import_cache.pop(next(iter(import_cache)))
+    return list(modules), list(module_lines)
+
+
+def get_imported_from_file(path: Path) -> tuple[list[str], list[str]]:
+    """
+    Gets the imported modules from a file. If the file has the same modification time and size as the last time, it
+    isn't even read again.
+
+    :param path: A pathlib.Path object that points to the file.
+    :return: A tuple of two lists of strings, like "bundle_tools.imported.get_imported()".
+    """
+    stat = path.stat()
+    with file_cache_lock:
+        cached = file_cache.get(path)
+    if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return list(cached[2][0]), list(cached[2][1])
+    result = get_imported(path.read_text(errors="replace"))
+    with file_cache_lock:
+        file_cache[path] = (stat.st_mtime_ns, stat.st_size, result)
+    return result
+
+
+def list_project_files(device_drive: Path) -> list[Path]:
+    """
+    Lists the Python files of the project on a device - every .py file, except the ones in packages in the lib directory
+    (those come from the bundle) and hidden files. (Like the ones macOS leaves everywhere)
+
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :return: A sorted list of pathlib.Path objects.
+    """
+    files = []
+    for path in device_drive.rglob("*.py"):
+        parts = path.relative_to(device_drive).parts
+        if any(part.startswith(".") for part in parts):
+            continue
+        if parts[0] == "lib" and len(parts) > 2:
+            continue
+        files.append(path)
+    return sorted(files)
+
+
+def local_module_names(path: Path, device_drive: Path) -> list[str]:
+    """
+    Gets the names a file on the device can be imported by, including the packages it is in. Files in the lib
+    directory are imported as if they were next to code.py.
+
+    :param path: A pathlib.Path object that points to the file.
+    :param device_drive: A pathlib.Path object that points to the device.
+    :return: A list of strings, like ["helpers", "helpers.wifi"] for "helpers/wifi.py".
+    """
+    parts = list(path.relative_to(device_drive).with_suffix("").parts)
+    if parts[0] == "lib":
+        parts = parts[1:]
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return [".".join(parts[:end]) for end in range(1, len(parts) + 1)]
+
+
+def scan_project(device_drive: Path, entry_points: list[Path] = None,
+                 max_workers: int = MAX_WORKERS) -> tuple[list[str], list[Path]]:
+    """
+    Gets every module a project on a device needs that isn't part of the project itself. Starting from the entry points
+    (like code.py), local imports (like "import helpers" for "helpers.py") are followed to the files they import, and
+    so on. Only the files that are reached are read, a wave at a time in parallel, and files that haven't changed since
+    the last scan aren't read again.
+
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :param entry_points: A list of pathlib.Path objects of the files to start from, like the code file. If None, every
+      Python file of the project is used. Defaults to None.
+    :param max_workers: An integer with how many files to read at the same time. Defaults to MAX_WORKERS.
+    :return: A tuple of a list of strings with the modules needed (like "adafruit_display_text"), in the order they
+      were found, and a list of pathlib.Path objects with the files that were scanned.
+    """
+    files = list_project_files(device_drive)
+    if entry_points is None:
+        entry_points = files
+    # Every file in (or under) each local module, and the file each local module itself is
+    local = {}
+    entries = {}
+    for path in files:
+        names = local_module_names(path, device_drive)
+        for name in names:
+            local.setdefault(name, []).append(path)
+        if names:
+            entries[names[-1]] = path
+    needed = []
+    scanned = []
+    imports = {}
+    wave = list(dict.fromkeys(entry_points))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Read in waves, so only the files that are reached from the entry points are read at all
+        while wave:
+            imports.update(zip(wave, executor.map(get_imported_from_file, wave)))
+            next_wave = []
+            for path in wave:
+                scanned.append(path)
+                for name in imports[path][0]:
+                    parts = name.split(".")
+                    prefixes = [".".join(parts[:end]) for end in range(len(parts), 0, -1)]
+                    match = next((prefix for prefix in prefixes if prefix in local), None)
+                    if match is not None:
+                        # Importing a.b runs a/__init__.py too
+                        reached = [entries[prefix] for prefix in prefixes[1:] if prefix in entries] + local[match]
+                        next_wave += [file for file in reached if file not in imports and file not in next_wave]
+                        # Files in the lib directory are libraries (maybe from the bundle) so they are still needed
+                        if all(file.relative_to(device_drive).parts[0] == "lib" for file in local[match]) and \
+                                name not in needed:
+                            needed.append(name)
+                    elif name not in needed:
+                        needed.append(name)
+            wave = next_wave
+    logger.debug(f"Scanned {len(scanned)} of {len(files)} files on {repr(device_drive)}, needs {repr(needed)}")
+    return needed, scanned
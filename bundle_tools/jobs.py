@@ -0,0 +1,137 @@
+"""
+A module that runs jobs, like installing and uninstalling modules, on a bounded pool of worker threads.
+
+-----------
+
+Classes list:
+
+- Job.__init__(self, name: str, action: str)
+- JobQueue.__init__(self, max_workers: int = MAX_WORKERS)
+
+-----------
+
+Functions list:
+
+No functions!
+
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Callable, Union
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# How many jobs to run at the same time. CircuitPython drives are slow, so there is no point in running many more
+MAX_WORKERS = 4
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """
+    A job in a JobQueue. Read its status, result and error to find out how it went.
+    """
+    def __init__(self, name: str, action: str):
+        self.name = name
+        self.action = action
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Union[Exception, None] = None
+
+    @property
+    def finished(self) -> bool:
+        """
+        Whether the job is done or failed.
+
+        :return: A bool.
+        """
+        return self.status in (DONE, FAILED)
+
+    def __repr__(self) -> str:
+        return f"Job({repr(self.action)}, {repr(self.name)}, {self.status})"
+
+
+class JobQueue:
+    """
+    Runs jobs on a bounded pool of worker threads, keeping track of how each one went. Unless asked otherwise, a job
+    with the same action and name as one that hasn't finished yet isn't run twice.
+    """
+    def __init__(self, max_workers: int = MAX_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.lock = Lock()
+        self.active: list[Job] = []
+
+    def submit(self, name: str, action: str, function: Callable, *args, dedupe: bool = True, **kwargs) -> Job:
+        """
+        Queue a job.
+
+        :param name: A string with what the job is about, like the name of a module.
+        :param action: A string with what the job does, like "install".
+        :param function: The function to run. Its return value becomes the job's result.
+        :param args: Arguments to pass to the function.
+        :param dedupe: A bool telling whether to return the job already queued or running for the same action and name
+          instead of queueing another one. Pass False when jobs with the same name can do different work, like batches
+          written to the same device. Defaults to True.
+        :param kwargs: Keyword arguments to pass to the function.
+        :return: The Job, or the job that was already queued or running for the same action and name.
+        """
+        with self.lock:
+            if dedupe:
+                for active_job in self.active:
+                    if active_job.action == action and active_job.name == name:
+                        logger.debug(f"{active_job} is already queued!")
+                        return active_job
+            job = Job(name, action)
+            self.active.append(job)
+        logger.debug(f"Queued {job}")
+        self.executor.submit(self.run, job, function, *args, **kwargs)
+        return job
+
+    def run(self, job: Job, function: Callable, *args, **kwargs) -> None:
+        """
+        Run a job, this will block. Called by the worker threads.
+
+        :param job: The Job.
+        :param function: The function to run.
+        :param args: Arguments to pass to the function.
+        :param kwargs: Keyword arguments to pass to the function.
+        :return: None.
+        """
+        job.status = RUNNING
+        logger.debug(f"Running {job}")
+        try:
+            job.result = function(*args, **kwargs)
+        except Exception as e:
+            logger.exception(f"{job} failed!")
+            job.error = e
+            job.status = FAILED
+        else:
+            job.status = DONE
+        with self.lock:
+            self.active.remove(job)
+        logger.debug(f"Finished {job}")
+
+    def pending(self, action: str = None) -> int:
+        """
+        How many jobs are queued or running.
+
+        :param action: A string to only count jobs that do this, or None to count every job. Defaults to None.
+        :return: An integer.
+        """
+        with self.lock:
+            return len([job for job in self.active if action is None or job.action == action])
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting jobs, and wait for the jobs already queued to finish.
+
+        :param wait: A bool telling whether to wait for the jobs to finish. Defaults to True.
+        :return: None.
+        """
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,201 @@
+"""
+A module that syncs a CircuitPython device to a manifest - a list of the modules that should be on it and the bundle
+version they come from.
+
+-----------
+
+Classes list:
+
+No classes!
+
+-----------
+
+Functions list:
+
+- load_manifest(path: Path) -> dict
+- save_manifest(path: Path, version: int, names: list[str]) -> None
+- plan_sync(manifest: dict, device_drive: Path, remove_extra: bool = True, keep_installed: bool = False) -> dict
+- fit_plan(plan: dict, device_drive: Path) -> dict
+- plan_and_fit(manifest: dict, device_drive: Path, remove_extra: bool = True, keep_installed: bool = False) -> dict
+- apply_plan(plan: dict, device_drive: Path) -> dict
+
+"""
+
+from pathlib import Path
+import json
+from bundle_tools import bundle_manager, modules, device_writer
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+
+def load_manifest(path: Path) -> dict:
+    """
+    Loads a manifest, which is a JSON file like {"version": 6, "modules": ["adafruit_display_text", "neopixel.mpy"]}.
+
+    :param path: A pathlib.Path object that points to the manifest.
+    :return: A dictionary with the keys "version" (an integer) and "modules" (a list of strings).
+    """
+    manifest = json.loads(path.read_text())
+    if not isinstance(manifest.get("version"), int) or not isinstance(manifest.get("modules"), list):
+        logger.error(f"{path} is not a manifest!")
+        raise ValueError(f"{path} is not a manifest! It needs a \"version\" and a list of \"modules\".")
+    logger.debug(f"Loaded manifest with {len(manifest['modules'])} modules for version {manifest['version']}")
+    return manifest
+
+
+def save_manifest(path: Path, version: int, names: list[str]) -> None:
+    """
+    Saves a manifest.
+
+    :param path: A pathlib.Path object that points to where to save the manifest.
+    :param version: An integer saying what bundle version the modules come from, like 6 for CircuitPython 6.x.
+    :param names: A list of strings with the names of the modules, like ["adafruit_display_text"].
+    :return: None.
+    """
+    path.write_text(json.dumps({"version": version, "modules": sorted(names)}, indent=4))
+    logger.debug(f"Saved manifest with {len(names)} modules to {repr(path)}")
+
+
+def plan_sync(manifest: dict, device_drive: Path, remove_extra: bool = True, keep_installed: bool = False) -> dict:
+    """
+    Works out the smallest set of changes that makes the device match a manifest. Modules needed by the modules in the
+    manifest count as part of it.
+
+    :param manifest: A dictionary, as returned by "bundle_tools.manifest.load_manifest()".
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :param remove_extra: A bool telling whether to remove modules on the device that aren't in the manifest. Only
+      modules that are in the bundle are removed, so files of your own in the lib folder are left alone. Defaults to
+      True.
+    :param keep_installed: A bool telling whether to leave modules that are already on the device as they are, even if
+      they are different from the bundle, when they are only needed by the modules in the manifest. Defaults to False.
+    :return: A dictionary with the keys "version", "add", "update", "remove" and "unchanged", which are lists of module
+      names, "writes" and "deletes", which are lists of the files that the plan will write (as tuples of the source
+      and the destination pathlib.Path objects) and delete, and "files", which maps every module that changes to a
+      dictionary with its own "writes" and "deletes".
+    """
+    version = manifest["version"]
+    bundle_path = bundle_manager.get_bundle_path(version)
+    if bundle_path is None:
+        logger.error(f"No bundle was downloaded for version {version}!")
+        raise FileNotFoundError(f"No bundle was downloaded for version {version}!")
+    lib_path = modules.get_lib_path(device_drive)
+    # Planning against a device with a half finished batch on it would plan against the wrong files
+    if lib_path.exists():
+        device_writer.recover(lib_path)
+    installed = modules.list_modules(device_drive)
+    wanted = bundle_manager.resolve_dependencies(version, manifest["modules"])
+    missing = [name for name in wanted if not (bundle_path / name).exists()]
+    if missing:
+        logger.error(f"{missing} are not in the bundle for version {version}!")
+        raise ValueError(f"{', '.join(missing)} are not in the bundle for version {version}!")
+    plan = {"version": version, "add": [], "update": [], "remove": [], "unchanged": [], "writes": [], "deletes": [],
+            "files": {}}
+    for name in wanted:
+        module_path = bundle_path / name
+        installed_path = lib_path / name
+        if keep_installed and name in installed and name not in manifest["modules"]:
+            plan["unchanged"].append(name)
+            continue
+        if installed_path.exists() and installed_path.is_dir() != module_path.is_dir():
+            # A file where a package should be (or the other way around) can't be patched, so replace it
+            plan["remove"].append(name)
+            plan["add"].append(name)
+            to_write = list(modules.list_module_files(module_path))
+            to_delete = []
+        else:
+            to_write, to_delete = modules.plan_module_sync(module_path, lib_path,
+                                                           bundle_manager.get_module_files(version, name))
+            if name not in installed:
+                plan["add"].append(name)
+            elif to_write or to_delete:
+                plan["update"].append(name)
+            else:
+                plan["unchanged"].append(name)
+        writes = [(bundle_path / relative_path, lib_path / relative_path) for relative_path in to_write]
+        if writes or to_delete:
+            plan["files"][name] = {"writes": writes, "deletes": to_delete}
+        plan["writes"] += writes
+        plan["deletes"] += to_delete
+    if remove_extra:
+        plan["remove"] += [name for name in installed if name not in wanted and (bundle_path / name).exists()]
+    logger.debug(f"Plan to sync {repr(device_drive)}: add {plan['add']}, update {plan['update']}, "
+                 f"remove {plan['remove']}, {len(plan['unchanged'])} unchanged")
+    return plan
+
+
+def fit_plan(plan: dict, device_drive: Path) -> dict:
+    """
+    Makes a plan smaller until it fits in the free space on the device, counting the space the modules it removes will
+    free up. Modules are dropped from the end, and dependencies come before the modules that need them, so a module is
+    never kept without its dependencies.
+
+    :param plan: A dictionary, as returned by "bundle_tools.manifest.plan_sync()".
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :return: A new plan, with the key "dropped" added which is a list of the names of the modules that were dropped. If
+      everything fits, "dropped" is empty.
+    """
+    lib_path = modules.get_lib_path(device_drive)
+    freed_files = []
+    for name in plan["remove"]:
+        if name not in plan["add"] and (lib_path / name).exists():
+            freed_files += list(modules.list_module_files(lib_path / name).values())
+    kept = device_writer.fit_groups({name: files["writes"] for name, files in plan["files"].items()}, lib_path,
+                                    freed_files)
+    dropped = [name for name in plan["files"] if name not in kept]
+    if dropped:
+        logger.warning(f"Only {len(kept)} of {len(plan['files'])} modules fit on {repr(device_drive)}, dropped {dropped}")
+    return {
+        **plan,
+        "add": [name for name in plan["add"] if name not in dropped],
+        "update": [name for name in plan["update"] if name not in dropped],
+        # A module that was going to be replaced stays as it is
+        "remove": [name for name in plan["remove"] if name not in dropped],
+        "writes": [write for name in kept for write in plan["files"][name]["writes"]],
+        "deletes": [path for name in kept for path in plan["files"][name]["deletes"]],
+        "files": {name: plan["files"][name] for name in kept},
+        "dropped": dropped
+    }
+
+
+def plan_and_fit(manifest: dict, device_drive: Path, remove_extra: bool = True, keep_installed: bool = False) -> dict:
+    """
+    Plans syncing a device to a manifest and makes the plan fit on the device. This reads the device and waits for any
+    batch being written to it, so run it in the background.
+
+    :param manifest: A dictionary, as returned by "bundle_tools.manifest.load_manifest()".
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :param remove_extra: A bool, see "bundle_tools.manifest.plan_sync()". Defaults to True.
+    :param keep_installed: A bool, see "bundle_tools.manifest.plan_sync()". Defaults to False.
+    :return: A plan, as returned by "bundle_tools.manifest.fit_plan()".
+    """
+    return fit_plan(plan_sync(manifest, device_drive, remove_extra, keep_installed), device_drive)
+
+
+def apply_plan(plan: dict, device_drive: Path) -> dict:
+    """
+    Does everything a plan says in one batch: modules to remove are removed first, then every file is written in one
+    burst. (See "bundle_tools.device_writer.write_files()") If the plan doesn't fit on the device,
+    "bundle_tools.device_writer.NotEnoughSpace" is raised before anything is touched - see
+    "bundle_tools.manifest.fit_plan()" to make it smaller.
+
+    :param plan: A dictionary, as returned by "bundle_tools.manifest.plan_sync()".
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :return: The plan, with the key "written" added which is a list of the pathlib.Path objects that were written.
+    """
+    lib_path = modules.get_lib_path(device_drive)
+    # Nothing else may write to the device between checking the space and writing
+    with device_writer.device_lock(lib_path):
+        removed = [lib_path / name for name in plan["remove"] if (lib_path / name).exists()]
+        if plan["writes"]:
+            # Check before removing anything, so a plan that doesn't fit leaves the device as it was
+            removed_files = [path for module_path in removed
+                             for path in modules.list_module_files(module_path).values()]
+            device_writer.check_free_space(lib_path, plan["writes"], removed_files)
+        if removed:
+            device_writer.remove_paths(lib_path, removed)
+        plan["written"] = device_writer.write_files(lib_path, plan["writes"], plan["deletes"])
+    logger.info(f"Synced {repr(device_drive)}: added {len(plan['add'])}, updated {len(plan['update'])} and removed "
+                f"{len(plan['remove'])} modules, wrote {len(plan['written'])} files")
+    return plan
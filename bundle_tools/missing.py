@@ -0,0 +1,98 @@
+"""
+A module that works out which modules a project imports that aren't on the device yet, and installs them.
+
+-----------
+
+Classes list:
+
+No classes!
+
+-----------
+
+Functions list:
+
+- detect_imported(device_drive: Path, entry_points: list[Path] = None, version: int = None) -> list[str]
+- find_missing(device_drive: Path, version: int, imported: list[str]) -> tuple[list[str], list[str]]
+- plan_missing(device_drive: Path, version: int, imported: list[str]) -> dict
+
+"""
+
+from pathlib import Path
+from bundle_tools import bundle_manager, modules, manifest, core_modules, imported as imported_modules
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+
+def detect_imported(device_drive: Path, entry_points: list[Path] = None, version: int = None) -> list[str]:
+    """
+    Finds the modules a project on a device imports, leaving out the ones built into the firmware on the device.
+
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :param entry_points: A list of pathlib.Path objects of the files to start from, like the code file. See
+      "bundle_tools.imported.scan_project()". Defaults to None.
+    :param version: An integer with the major CircuitPython version to use if boot_out.txt doesn't say, like 7. Defaults
+      to None, which uses the newest version known.
+    :return: A list of strings with the top level names of the imported modules, in the order they were found.
+    """
+    found, _ = imported_modules.scan_project(device_drive, entry_points)
+    names = list(dict.fromkeys(name.split(".")[0] for name in found))
+    device_version, board_id = core_modules.read_boot_out(device_drive)
+    names = core_modules.filter_core_modules(names, device_version or version or max(core_modules.ADDED_MODULES),
+                                             board_id)
+    logger.debug(f"{repr(device_drive)} imports {repr(names)}")
+    return names
+
+
+def find_missing(device_drive: Path, version: int, imported: list[str]) -> tuple[list[str], list[str]]:
+    """
+    Works out which imported modules have to be installed from the bundle.
+
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :param version: An integer saying what bundle version to use, like 6 for CircuitPython 6.x.
+    :param imported: A list of strings with the imported modules, like from "bundle_tools.missing.detect_imported()".
+    :return: A tuple of a list of strings with the names of the modules in the bundle that aren't installed, and a list
+      of strings with the imports that aren't installed, built in or in the bundle.
+    """
+    index = bundle_manager.get_bundle_index(version)
+    if index is None:
+        logger.error(f"No bundle was downloaded for version {version}!")
+        raise FileNotFoundError(f"No bundle was downloaded for version {version}!")
+    # The firmware on the device may not be the version of the bundle
+    device_version, board_id = core_modules.read_boot_out(device_drive)
+    core = core_modules.get_core_modules(device_version or version, board_id)
+    installed = modules.list_modules(device_drive)
+    # A module installed as a .py counts the same as the .mpy in the bundle
+    installed_names = set(installed) | {name.rsplit(".", 1)[0] for name in installed}
+    missing = []
+    unknown = []
+    for name in dict.fromkeys(name.split(".")[0] for name in imported):
+        if name in core or name in installed_names:
+            continue
+        entry = bundle_manager.resolve_import(version, name)
+        if entry is None:
+            unknown.append(name)
+        elif entry not in missing:
+            missing.append(entry)
+    logger.debug(f"Missing from {repr(device_drive)}: {repr(missing)}, not in the bundle: {repr(unknown)}")
+    return missing, unknown
+
+
+def plan_missing(device_drive: Path, version: int, imported: list[str]) -> dict:
+    """
+    Plans installing the imported modules that aren't on the device, along with anything they need that isn't on the
+    device either, and makes the plan fit on the device. Modules that are already installed are left alone. This reads
+    the device, so run it in the background.
+
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :param version: An integer saying what bundle version to use, like 6 for CircuitPython 6.x.
+    :param imported: A list of strings with the imported modules.
+    :return: A plan, like from "bundle_tools.manifest.fit_plan()", with the key "unknown" added which is a list of the
+      imports that couldn't be found.
+    """
+    missing, unknown = find_missing(device_drive, version, imported)
+    plan = manifest.plan_and_fit({"version": version, "modules": missing}, device_drive, remove_extra=False,
+                                 keep_installed=True)
+    plan["unknown"] = unknown
+    return plan
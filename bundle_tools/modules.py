@@ -13,18 +13,24 @@ Functions list:
 
 - get_lib_path(device_drive: Path = None) -> Path
 - list_modules(start_path: Path = None) -> list
-- install_module(module_path: Path = None, device_path: Path = None) -> None
+- file_crc(path: Path, chunk_size: int = CHUNK_SIZE) -> int
+- list_module_files(module_path: Path) -> dict[str, Path]
+- plan_module_sync(module_path: Path, device_path: Path, files: dict = None) -> tuple[list[str], list[Path]]
 - uninstall_module(module_path: Path = None) -> None
 
 """
 
 from pathlib import Path
-from shutil import copy2, copytree, rmtree
+from zlib import crc32
+from bundle_tools import device_writer
 from bundle_tools.create_logger import create_logger
 import logging
 
 logger = create_logger(name=__name__, level=logging.DEBUG)
 
+# How many bytes to read at a time when hashing files
+CHUNK_SIZE = 64 * 1024
+
 
 def get_lib_path(device_drive: Path = None) -> Path:
     """
@@ -77,34 +83,83 @@ def list_modules_in_bundle(start_path: Path) -> list[str]:
     return libs
 
 
-def install_module(module_path: Path = None, device_path: Path = None) -> None:
+def file_crc(path: Path, chunk_size: int = CHUNK_SIZE) -> int:
+    """
+    Gets the CRC32 of a file, the same checksum the bundle zip stores for every file.
+
+    :param path: A pathlib.Path object that points to the file.
+    :param chunk_size: An integer with how many bytes to read at a time. Defaults to CHUNK_SIZE.
+    :return: An integer.
+    """
+    crc = 0
+    with path.open(mode="rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            crc = crc32(chunk, crc)
+    return crc
+
+
+def list_module_files(module_path: Path) -> dict[str, Path]:
+    """
+    Lists the files in a module, relative to the lib directory the module is in, skipping hidden files. (Like the ._
+    files macOS leaves everywhere)
+
+    :param module_path: A pathlib.Path object that points to the module, like ".../lib/adafruit_bus_device" or
+      "I:/lib/neopixel.mpy".
+    :return: A dictionary of paths relative to the lib directory (like "adafruit_bus_device/i2c_device.mpy") to the
+      pathlib.Path objects of the files.
+    """
+    if module_path.is_file():
+        return {module_path.name: module_path}
+    return {
+        path.relative_to(module_path.parent).as_posix(): path
+        for path in sorted(module_path.rglob("*"))
+        if path.is_file() and not any(part.startswith(".") for part in path.relative_to(module_path).parts)
+    }
+
+
+def plan_module_sync(module_path: Path, device_path: Path, files: dict = None) -> tuple[list[str], list[Path]]:
     """
-    Pass in the path to the module (ex. ".../adafruit-circuitpython-bundle-6.x-mpy-20201126/lib/adafruit_bus_device")
-    and the device path (ex. "I:lib") will copy the directory/file to the device.
+    Works out which files of a module have to be written to the device, and which files on the device don't belong to
+    the module anymore. A file is only written if its size or its CRC32 is different - reading the device is a lot
+    cheaper than writing to it.
 
     :param module_path: A pathlib.Path object that points to the path of the module.
     :param device_path: A pathlib.Path object that points to the path of the device's lib directory.
-    :return: None
+    :param files: A dictionary of the files in the module, like in the modules of a bundle index. (See
+      "bundle_tools.bundle_manager.build_bundle_index()") If None, the CRCs are calculated from the module instead.
+      Defaults to None.
+    :return: A tuple of a list of strings with the paths of the files to write, relative to the lib directory, and a
+      list of pathlib.Path objects with the files to delete from the device.
     """
-    if not module_path.exists():
-        logger.error(f"{module_path} does not exist!")
-        raise FileNotFoundError(f"{module_path} does not exist!")
-    if not device_path.exists():
-        logger.error(f"{device_path} does not exist!")
-        raise FileNotFoundError(f"{device_path} does not exist!")
-    if module_path.is_file():
-        logger.debug(f"Installing {repr(module_path)} to {repr(device_path)}...")
-        copy2(module_path, device_path)
-    else:
-        logger.debug(f"Installing {repr(module_path)} to {repr(device_path / module_path.stem)}...")
-        copytree(module_path, device_path / module_path.stem)
-    logger.info(f"Successfully installed {repr(module_path)}!")
+    source_files = list_module_files(module_path)
+    if files is None:
+        files = {}
+    to_write = []
+    for relative_path, source in source_files.items():
+        destination = device_path / relative_path
+        expected = files.get(relative_path)
+        if expected is None:
+            expected = {"size": source.stat().st_size, "crc": None}
+        if destination.is_file() and destination.stat().st_size == expected["size"]:
+            if expected["crc"] is None:
+                expected["crc"] = file_crc(source)
+            if file_crc(destination) == expected["crc"]:
+                continue
+        to_write.append(relative_path)
+    to_delete = []
+    installed_path = device_path / module_path.name
+    if module_path.is_dir() and installed_path.is_dir():
+        to_delete = [path for relative_path, path in list_module_files(installed_path).items()
+                     if relative_path not in source_files]
+    logger.debug(f"{len(to_write)} of {len(source_files)} files of {repr(module_path.name)} changed, "
+                 f"{len(to_delete)} to delete")
+    return to_write, to_delete
 
 
 def uninstall_module(module_path: Path = None) -> None:
     """
     Pass in the path to the module (ex. "I:lib/adafruit_bus_device") on
-    the device will delete the directory/file on the device.
+    the device will delete the directory/file on the device. (See "bundle_tools.device_writer.remove_paths()")
 
     :param module_path: A pathlib.Path object that points to the path of the module **ON THE DEVICE**.
     :return: None
@@ -113,8 +168,5 @@ def uninstall_module(module_path: Path = None) -> None:
         logger.error(f"{module_path} does not exist!")
         raise FileNotFoundError(f"{module_path} does not exist!")
     logger.debug(f"Uninstalling {repr(module_path)}...")
-    if module_path.is_file():
-        module_path.unlink()
-    else:
-        rmtree(module_path, ignore_errors=True)
+    device_writer.remove_paths(module_path.parent, [module_path])
     logger.info(f"Successfully uninstalled {repr(module_path)}!")
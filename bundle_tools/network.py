@@ -0,0 +1,194 @@
+"""
+A module that handles downloading files over a shared, pooled HTTP session.
+
+-----------
+
+Classes list:
+
+No classes!
+
+-----------
+
+Functions list:
+
+- configure_session(retries: int = RETRIES, backoff_factor: float = BACKOFF_FACTOR) -> requests.Session
+- get_session() -> requests.Session
+- stream_to_file(url: str, path: Path, chunk_size: int = CHUNK_SIZE, headers: dict = None,
+                 progress: Callable[[int, Union[int, None]], None] = None,
+                 hash_name: str = None) -> Union[dict, None]
+
+"""
+
+from pathlib import Path
+import hashlib
+from time import sleep
+from threading import RLock
+from typing import Union, Callable
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# How many bytes to read from the network and write to disk at a time
+CHUNK_SIZE = 64 * 1024
+# How many times to retry a request (or resume a broken transfer) before giving up
+RETRIES = 5
+# How long to wait between retries, which doubles every retry. (0.5, 1, 2, 4...)
+BACKOFF_FACTOR = 0.5
+# How many connections to keep alive per host, which should be at least as many as parallel downloads
+POOL_SIZE = 10
+# The ETag (or Last-Modified date) a partly downloaded file was downloaded with is kept in a file ending in this
+VALIDATOR_SUFFIX = ".validator"
+
+session: Union[requests.Session, None] = None
+session_lock = RLock()
+session_retries = RETRIES
+session_backoff_factor = BACKOFF_FACTOR
+
+
+def configure_session(retries: int = RETRIES, backoff_factor: float = BACKOFF_FACTOR) -> requests.Session:
+    """
+    (Re)creates the shared session with keep-alive connections that retry failed requests with an exponential backoff.
+
+    :param retries: An integer with how many times to retry a request or resume a broken transfer. Defaults to RETRIES.
+    :param backoff_factor: A float with how many seconds to wait before the first retry. Defaults to BACKOFF_FACTOR.
+    :return: The new requests.Session.
+    """
+    global session, session_retries, session_backoff_factor
+    logger.debug(f"Configuring session with {retries} retries and a backoff factor of {backoff_factor}")
+    retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=("GET", "HEAD"))
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+    new_session = requests.Session()
+    new_session.mount("https://", adapter)
+    new_session.mount("http://", adapter)
+    with session_lock:
+        # Don't close the old session, another thread might be in the middle of a download with it
+        session = new_session
+        session_retries = retries
+        session_backoff_factor = backoff_factor
+    return new_session
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the shared session, creating it with the default settings if needed.
+
+    :return: A requests.Session.
+    """
+    with session_lock:
+        if session is None:
+            return configure_session(session_retries, session_backoff_factor)
+        return session
+
+
+def stream_to_file(url: str, path: Path, chunk_size: int = CHUNK_SIZE, headers: dict = None,
+                   progress: Callable[[int, Union[int, None]], None] = None,
+                   hash_name: str = None) -> Union[dict, None]:
+    """
+    Downloads a file to a path in chunks. If the path already has part of the file in it (from a transfer that broke
+    before), only the rest is requested with an HTTP Range header. Transfers that break in the middle are resumed the
+    same way, up to the configured number of retries. Resuming sends an If-Range header with the ETag (or
+    Last-Modified date) the part was downloaded with, which is kept in a file next to the path, so a part of a file that
+    has changed since is thrown away instead of having the rest of the new file added to it.
+
+    :param url: A string that points to the file to download.
+    :param path: A pathlib.Path object that points to where to download. Delete it first if you don't want to resume.
+    :param chunk_size: An integer with how many bytes to read at a time. Defaults to CHUNK_SIZE.
+    :param headers: A dictionary of extra headers to send, like "If-None-Match". Defaults to None.
+    :param progress: A function that gets called with how many bytes we have and how many bytes there are in total
+      (or None if the server didn't say) after every chunk. Defaults to None.
+    :param hash_name: A string with the name of a hashlib algorithm, like "sha256", to hash the finished file with.
+      Defaults to None.
+    :return: A dictionary with the keys "headers", "size" and "digest" (a hex string, or None if no hash_name was
+      given), or None if the server said the file was not modified.
+    :raises OSError: If the server sent more than the file is long.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    validator_path = path.with_name(path.name + VALIDATOR_SUFFIX)
+    attempt = 0
+    while True:
+        validator = validator_path.read_text() if validator_path.exists() else None
+        if path.exists() and validator is None:
+            # We can't tell what this part is of, so don't add to it
+            logger.debug(f"{repr(path)} has no validator, starting again")
+            path.unlink()
+        data_length = path.stat().st_size if path.exists() else 0
+        request_headers = dict(headers or {})
+        if data_length > 0:
+            logger.debug(f"Resuming {repr(url)} from byte {data_length}")
+            request_headers["Range"] = f"bytes={data_length}-"
+            request_headers["If-Range"] = validator
+        try:
+            with get_session().get(url, stream=True, headers=request_headers) as response:
+                if response.status_code == 304:
+                    logger.debug(f"{repr(url)} was not modified")
+                    return None
+                content_range = response.headers.get("content-range", "")
+                if response.status_code == 416 and data_length > 0:
+                    # Like "bytes */1234", the length of the whole file
+                    if content_range.split("/")[-1] == str(data_length):
+                        logger.debug(f"{repr(path)} is already complete")
+                        total_length = data_length
+                        response_headers = response.headers
+                        break
+                    logger.warning(f"{repr(path)} doesn't match {repr(url)} anymore, starting again")
+                    path.unlink()
+                    attempt += 1
+                    if attempt > session_retries:
+                        response.raise_for_status()
+                    continue
+                response.raise_for_status()
+                if response.status_code != 206 or not content_range.startswith(f"bytes {data_length}-"):
+                    # The server ignored the Range header (or the file changed), so start again from the beginning
+                    data_length = 0
+                new_validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+                if data_length == 0:
+                    if new_validator is not None:
+                        validator_path.write_text(new_validator)
+                    else:
+                        validator_path.unlink(missing_ok=True)
+                if response.status_code == 206:
+                    total_length = content_range.split("/")[-1]
+                    total_length = int(total_length) if total_length.isdigit() else None
+                else:
+                    total_length = response.headers.get("content-length")
+                    total_length = int(total_length) if total_length is not None else None
+                response_headers = response.headers
+                with path.open(mode="ab" if data_length > 0 else "wb") as file:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        file.write(chunk)
+                        data_length += len(chunk)
+                        if progress is not None:
+                            progress(data_length, total_length)
+            if total_length is not None and data_length > total_length:
+                logger.error(f"Got {data_length} bytes from {repr(url)}, but it is only {total_length} bytes long!")
+                path.unlink()
+                validator_path.unlink(missing_ok=True)
+                raise OSError(f"Got {data_length} bytes from {url}, but it is only {total_length} bytes long!")
+            if total_length is not None and data_length < total_length:
+                # The connection closed early without an error, so resume like any other broken transfer
+                raise requests.exceptions.ConnectionError(f"Got {data_length} of {total_length} bytes")
+        except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError):
+            attempt += 1
+            if attempt > session_retries:
+                raise
+            delay = session_backoff_factor * (2 ** (attempt - 1))
+            logger.warning(f"Transfer of {repr(url)} broke at byte {path.stat().st_size if path.exists() else 0}, "
+                           f"resuming in {delay} seconds (attempt {attempt} of {session_retries})")
+            sleep(delay)
+            continue
+        break
+    validator_path.unlink(missing_ok=True)
+    logger.debug(f"Downloaded {data_length} bytes from {repr(url)} to {repr(path)}")
+    digest = None
+    if hash_name is not None:
+        hasher = hashlib.new(hash_name)
+        with path.open(mode="rb") as file:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+    return {"headers": response_headers, "size": data_length, "digest": digest}
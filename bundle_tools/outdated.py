@@ -0,0 +1,200 @@
+"""
+A module that finds the modules on a CircuitPython device that are older than the ones in the bundle.
+
+-----------
+
+Classes list:
+
+No classes!
+
+-----------
+
+Functions list:
+
+- read_version(path: Path, header_size: int = HEADER_SIZE) -> Union[str, None]
+- version_file(module_path: Path) -> Union[Path, None]
+- bundle_module_version(version: int, name: str) -> Union[str, None]
+- parse_version(version: str) -> Union[tuple, None]
+- sizes_differ(installed_path: Path, files: dict) -> bool
+- find_outdated(device_drive: Path, version: int) -> list[dict]
+- upgrade_all(device_drive: Path, version: int, names: list[str]) -> dict
+
+"""
+
+from pathlib import Path
+from threading import Lock
+from typing import Union
+import re
+from bundle_tools import bundle_manager, modules, manifest
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+# How many bytes to read from the start of a file to find its version. Reading less than a FAT cluster doesn't make the
+# device any faster, and libraries set __version__ right after their imports, so it is always in here
+HEADER_SIZE = 4096
+# In .py files: __version__ = "1.2.3"
+PY_VERSION_PATTERN = re.compile(rb"""__version__\s*=\s*["']([^"']+)["']""")
+# .mpy files keep the version as a plain string constant, but not the name __version__ next to it
+MPY_VERSION_PATTERN = re.compile(rb"(?<![0-9A-Za-z.])(\d+\.\d+\.\d+(?:-[0-9A-Za-z.]+)?)(?![0-9A-Za-z])")
+# Like "4.1.2" or "1.0.0-rc.1"
+SEMVER_PATTERN = re.compile(r"(\d+(?:\.\d+)*)(?:-([0-9A-Za-z.]+))?")
+# The files that are searched for a version first in a package
+VERSION_FILE_NAMES = ("__init__.mpy", "__init__.py")
+
+# The versions of modules in the bundles, by version, generation and module name
+bundle_versions: dict[tuple[int, str, str], Union[str, None]] = {}
+bundle_versions_lock = Lock()
+
+
+def read_version(path: Path, header_size: int = HEADER_SIZE) -> Union[str, None]:
+    """
+    Reads the version of a module file, only reading the start of it.
+
+    :param path: A pathlib.Path object that points to a .py or .mpy file.
+    :param header_size: An integer with how many bytes to read. Defaults to HEADER_SIZE.
+    :return: A string with the version, like "4.1.2", or None if it couldn't be found.
+    """
+    with path.open(mode="rb") as file:
+        header = file.read(header_size)
+    match = (PY_VERSION_PATTERN if path.suffix == ".py" else MPY_VERSION_PATTERN).search(header)
+    if match is None:
+        return None
+    version = match.group(1).decode("ascii", errors="replace")
+    # Libraries that were never released (or built from source) say this
+    return None if version.startswith("0.0.0") else version
+
+
+def version_file(module_path: Path) -> Union[Path, None]:
+    """
+    Gets the file of a module that its version is read from - the file itself, or the __init__ (or the first file) of a
+    package.
+
+    :param module_path: A pathlib.Path object that points to the module, like ".../lib/adafruit_bus_device".
+    :return: A pathlib.Path object, or None if the module has no .py or .mpy files.
+    """
+    if module_path.is_file():
+        return module_path if module_path.suffix in (".py", ".mpy") else None
+    for name in VERSION_FILE_NAMES:
+        if (module_path / name).is_file():
+            return module_path / name
+    candidates = sorted(path for path in module_path.iterdir() if path.suffix in (".py", ".mpy") and path.is_file())
+    return candidates[0] if candidates else None
+
+
+def bundle_module_version(version: int, name: str) -> Union[str, None]:
+    """
+    Gets the version of a module in the bundle stored internally. Versions are kept in memory once read.
+
+    :param version: An integer saying what version we want, like 5 for CircuitPython 5.x and 6 for CircuitPython 6.x.
+    :param name: A string with the name of the module, like "adafruit_bus_device".
+    :return: A string with the version, or None if it couldn't be found.
+    """
+    index = bundle_manager.get_bundle_index(version)
+    if index is None:
+        return None
+    key = (version, index["generation"], name)
+    with bundle_versions_lock:
+        if key in bundle_versions:
+            return bundle_versions[key]
+    path = version_file(bundle_manager.get_bundle_path(version) / name)
+    module_version = read_version(path) if path is not None else None
+    with bundle_versions_lock:
+        bundle_versions[key] = module_version
+    return module_version
+
+
+def parse_version(version: str) -> Union[tuple, None]:
+    """
+    Parses a version so versions can be compared. Pre-releases sort before their release, so "1.0.0-rc.1" is older
+    than "1.0.0".
+
+    :param version: A string with the version, like "4.1.2".
+    :return: A tuple that compares like the version, or None if the version couldn't be parsed.
+    """
+    match = SEMVER_PATTERN.fullmatch(version.strip())
+    if match is None:
+        return None
+    release = tuple(int(number) for number in match.group(1).split("."))
+    # Leave out trailing zeros so "1.2" and "1.2.0" are the same
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    if match.group(2) is None:
+        return release, (1,)
+    # Numeric parts sort before alphanumeric parts, like in semver
+    return release, (0,) + tuple((0, int(part), "") if part.isdigit() else (1, 0, part)
+                                 for part in match.group(2).split("."))
+
+
+def sizes_differ(installed_path: Path, files: dict) -> bool:
+    """
+    Checks whether the files of an installed module have different names or sizes than the ones in the bundle. Only
+    the directory entries are read, not the files.
+
+    :param installed_path: A pathlib.Path object that points to the module on the device.
+    :param files: A dictionary of the files in the module, like in the modules of a bundle index. (See
+      "bundle_tools.bundle_manager.build_bundle_index()")
+    :return: A bool.
+    """
+    lib_path = installed_path.parent
+    for relative_path, file in files.items():
+        path = lib_path / relative_path
+        if not path.is_file() or path.stat().st_size != file["size"]:
+            return True
+    return False
+
+
+def find_outdated(device_drive: Path, version: int) -> list[dict]:
+    """
+    Finds the modules on a device that are older than the ones in the bundle. Modules are compared by the version at
+    the start of their files, or by the sizes of their files if either side has no version. Modules that are newer than
+    the ones in the bundle, or aren't in the bundle, are left out so they are never downgraded.
+
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :param version: An integer saying what bundle version to compare against, like 6 for CircuitPython 6.x.
+    :return: A list of dictionaries with the keys "name", "installed" and "bundle", which are the versions (or None if
+      unknown).
+    """
+    index = bundle_manager.get_bundle_index(version)
+    if index is None:
+        logger.error(f"No bundle was downloaded for version {version}!")
+        raise FileNotFoundError(f"No bundle was downloaded for version {version}!")
+    lib_path = modules.get_lib_path(device_drive)
+    outdated = []
+    for name in modules.list_modules(device_drive):
+        if name not in index["modules"]:
+            continue
+        installed_path = lib_path / name
+        if installed_path.is_dir() != (index["modules"][name]["type"] == "package"):
+            outdated.append({"name": name, "installed": None, "bundle": bundle_module_version(version, name)})
+            continue
+        path = version_file(installed_path)
+        installed_version = read_version(path) if path is not None else None
+        bundle_version = bundle_module_version(version, name)
+        installed_key = parse_version(installed_version) if installed_version is not None else None
+        bundle_key = parse_version(bundle_version) if bundle_version is not None else None
+        if installed_key is not None and bundle_key is not None:
+            if installed_key < bundle_key:
+                outdated.append({"name": name, "installed": installed_version, "bundle": bundle_version})
+            elif installed_key > bundle_key:
+                logger.debug(f"{name} {installed_version} on {repr(device_drive)} is newer than {bundle_version} in "
+                             f"the bundle, leaving it alone")
+        elif sizes_differ(installed_path, index["modules"][name]["files"]):
+            outdated.append({"name": name, "installed": installed_version, "bundle": bundle_version})
+    logger.info(f"Found {len(outdated)} outdated modules on {repr(device_drive)}")
+    return outdated
+
+
+def upgrade_all(device_drive: Path, version: int, names: list[str]) -> dict:
+    """
+    Upgrades modules on a device to the ones in the bundle in one batch, along with anything they need.
+
+    :param device_drive: A pathlib.Path object that points to the device. Example: "I:" on Windows.
+    :param version: An integer saying what bundle version to upgrade to, like 6 for CircuitPython 6.x.
+    :param names: A list of strings with the names of the modules, like the names from
+      "bundle_tools.outdated.find_outdated()".
+    :return: The plan that was applied, see "bundle_tools.manifest.apply_plan()".
+    """
+    wanted = {"version": version, "modules": names}
+    return manifest.apply_plan(manifest.plan_sync(wanted, device_drive, remove_extra=False), device_drive)
@@ -0,0 +1,219 @@
+"""
+A module that searches through the modules in a bundle.
+
+-----------
+
+Classes list:
+
+No classes!
+
+-----------
+
+Functions list:
+
+- rank(query: str, name: str) -> Union[tuple[int, int, str], None]
+- search(query: str, names: list[str], previous_query: str = None, previous_results: list[str] = None) -> list[str]
+- tokenize(text: str) -> set[str]
+- module_signature(files: dict) -> int
+- extract_module_tokens(zip_file: ZipFile, lib_prefix: str, name: str, files: dict) -> list[str]
+- build_text_index(zip_path: Path, bundle_index: dict, previous: dict = None) -> dict
+- search_text(query: str, text_index: dict) -> list[str]
+
+"""
+
+from pathlib import Path
+from zipfile import ZipFile
+from zlib import crc32
+from bisect import bisect_left
+from typing import Union
+import json
+import ast
+import re
+from bundle_tools.create_logger import create_logger
+import logging
+
+logger = create_logger(name=__name__, level=logging.DEBUG)
+
+PREFIX = 0
+SUBSTRING = 1
+FUZZY = 2
+
+# Words are split on anything that isn't a letter or a number, but whole identifiers (like "adafruit_bme280") are
+# kept too
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+IDENTIFIER_PATTERN = re.compile(r"[a-z0-9_]+")
+# Compiled .mpy files keep their string constants (like __repo__) as plain bytes, so pull out anything readable
+MPY_STRING_PATTERN = re.compile(rb"[A-Za-z0-9_./:-]{4,}")
+# Words shorter than this aren't worth indexing
+MIN_TOKEN_LENGTH = 2
+
+
+def rank(query: str, name: str) -> Union[tuple[int, int, str], None]:
+    """
+    Ranks how well a name matches a query. Names that start with the query come first, then names that contain the
+    query, then names that contain all the characters of the query in order. (So "nep" fuzzy matches "neopixel")
+
+    :param query: A lowercase string with the search query.
+    :param name: A string with the name of the module.
+    :return: A tuple that sorts better matches first, or None if the name doesn't match at all.
+    """
+    lowered = name.lower()
+    if lowered.startswith(query):
+        return PREFIX, 0, lowered
+    position = lowered.find(query)
+    if position != -1:
+        return SUBSTRING, position, lowered
+    start = -1
+    index = -1
+    for character in query:
+        index = lowered.find(character, index + 1)
+        if index == -1:
+            return None
+        if start == -1:
+            start = index
+    # The fewer characters in between the matched characters, the better the match
+    return FUZZY, index - start + 1 - len(query), lowered
+
+
+def search(query: str, names: list[str], previous_query: str = None, previous_results: list[str] = None) -> list[str]:
+    """
+    Searches a list of names. If the query just adds characters to the end of the previous query, only the previous
+    results are searched, because anything that didn't match before can't match now.
+
+    :param query: A string with the search query. Searching is case-insensitive.
+    :param names: A list of strings with every name we can search through.
+    :param previous_query: A string with the previous search query, if any. Defaults to None.
+    :param previous_results: A list of strings with the results of the previous search query. Defaults to None.
+    :return: A list of strings with the names that matched, best matches first.
+    """
+    query = query.strip().lower()
+    if query == "":
+        return list(names)
+    if previous_query is not None and previous_results is not None and \
+            query.startswith(previous_query.strip().lower()) and previous_query.strip() != "":
+        candidates = previous_results
+        logger.debug(f"Narrowing {len(candidates)} previous results for {repr(query)}")
+    else:
+        candidates = names
+    ranked = []
+    for name in candidates:
+        name_rank = rank(query, name)
+        if name_rank is not None:
+            ranked.append((name_rank, name))
+    ranked.sort()
+    return [name for _, name in ranked]
+
+
+def tokenize(text: str) -> set[str]:
+    """
+    Splits text into the lowercase words we index and search for.
+
+    :param text: A string.
+    :return: A set of strings with the words.
+    """
+    lowered = text.lower()
+    tokens = set(WORD_PATTERN.findall(lowered)) | set(IDENTIFIER_PATTERN.findall(lowered))
+    return {token.strip("_") for token in tokens if len(token.strip("_")) >= MIN_TOKEN_LENGTH}
+
+
+def module_signature(files: dict) -> int:
+    """
+    Gets a number that changes whenever any file in a module changes.
+
+    :param files: A dictionary of file paths to dictionaries with the keys "size" and "crc", like in the modules of a
+      bundle index. (See "bundle_tools.bundle_manager.build_bundle_index()")
+    :return: An integer.
+    """
+    return crc32(json.dumps(sorted((path, file["size"], file["crc"]) for path, file in files.items())).encode())
+
+
+def extract_module_tokens(zip_file: ZipFile, lib_prefix: str, name: str, files: dict) -> list[str]:
+    """
+    Gets the words to index for a module: its name, the names of its submodules, the docstrings of .py files and the
+    readable strings (like the repository URL) inside of .mpy files.
+
+    :param zip_file: The zipfile.ZipFile of the bundle.
+    :param lib_prefix: A string with the path of the lib directory inside of the zip, like
+      "adafruit-circuitpython-bundle-6.x-mpy-20201217/lib/".
+    :param name: A string with the name of the module, like "adafruit_bus_device" or "neopixel.mpy".
+    :param files: A dictionary of the files in the module, like in the modules of a bundle index.
+    :return: A sorted list of strings with the words.
+    """
+    tokens = tokenize(name.rsplit(".", 1)[0] if "." in name else name)
+    for path in files:
+        tokens |= tokenize(path.rsplit(".", 1)[0])
+        if path.endswith(".py"):
+            try:
+                docstring = ast.get_docstring(ast.parse(zip_file.read(lib_prefix + path)))
+            except (SyntaxError, ValueError):
+                docstring = None
+            if docstring:
+                tokens |= tokenize(docstring)
+        elif path.endswith(".mpy"):
+            for string in MPY_STRING_PATTERN.findall(zip_file.read(lib_prefix + path)):
+                tokens |= tokenize(string.decode("ascii"))
+    return sorted(tokens)
+
+
+def build_text_index(zip_path: Path, bundle_index: dict, previous: dict = None) -> dict:
+    """
+    Builds an inverted index of the words in every module of a bundle. Modules that haven't changed since the previous
+    index are not read again.
+
+    :param zip_path: A pathlib.Path object pointing to the bundle zip.
+    :param bundle_index: The index of the bundle, as returned by "bundle_tools.bundle_manager.build_bundle_index()".
+    :param previous: The previous text index of the same version, if any. Defaults to None.
+    :return: A dictionary with the keys "modules", which maps the module names to dictionaries with the keys
+      "signature" and "tokens", and "postings", which maps each word to a list of the modules that have it.
+    """
+    previous_modules = previous["modules"] if previous is not None else {}
+    modules = {}
+    reused = 0
+    lib_prefix = f"{bundle_index['bundle_name']}/lib/"
+    with ZipFile(zip_path, "r") as zip_file:
+        for name, module in bundle_index["modules"].items():
+            signature = module_signature(module["files"])
+            if name in previous_modules and previous_modules[name]["signature"] == signature:
+                modules[name] = previous_modules[name]
+                reused += 1
+            else:
+                modules[name] = {"signature": signature,
+                                 "tokens": extract_module_tokens(zip_file, lib_prefix, name, module["files"])}
+    postings = {}
+    for name, module in modules.items():
+        for token in module["tokens"]:
+            postings.setdefault(token, []).append(name)
+    logger.debug(f"Indexed {len(postings)} words in {len(modules)} modules ({reused} reused from the previous index)")
+    return {"modules": modules, "postings": dict(sorted(postings.items()))}
+
+
+def search_text(query: str, text_index: dict) -> list[str]:
+    """
+    Searches a text index. Every word in the query has to be the start of a word in the module. (So "bme" finds
+    "adafruit_bme280")
+
+    :param query: A string with the search query.
+    :param text_index: A dictionary, as returned by "bundle_tools.search.build_text_index()".
+    :return: A list of strings with the names of the modules that matched, best matches first.
+    """
+    query_tokens = tokenize(query)
+    if not query_tokens:
+        return []
+    postings = text_index["postings"]
+    words = text_index.get("words")
+    if words is None:
+        words = text_index["words"] = list(postings)
+    matches = None
+    exact = {}
+    for query_token in query_tokens:
+        found = set()
+        index = bisect_left(words, query_token)
+        while index < len(words) and words[index].startswith(query_token):
+            found.update(postings[words[index]])
+            index += 1
+        for name in postings.get(query_token, []):
+            exact[name] = exact.get(name, 0) + 1
+        matches = found if matches is None else matches & found
+        if not matches:
+            return []
+    return sorted(matches, key=lambda name: (-exact.get(name, 0), name))
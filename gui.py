@@ -18,6 +18,7 @@ No functions!
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox as mbox
+from tkinter import filedialog as fd
 from gui_tools.right_click.entry import EntryWithRightClick
 from gui_tools.right_click.spinbox import SpinboxWithRightClick
 from gui_tools.right_click.combobox import ComboboxWithRightClick
@@ -33,13 +34,16 @@ import requests
 from markdown import markdown as markdown_to_html
 import webbrowser
 import json
-from bundle_tools import drives, modules, bundle_manager, os_detect, imported
-from typing import Union, Any
+from bundle_tools import drives, modules, bundle_manager, os_detect, network, search, jobs, manifest, fleet, outdated, device_writer, missing
+from typing import Union, Any, Callable
 from bundle_tools.create_logger import create_logger
 import logging
 
 logger = create_logger(name=__name__, level=logging.DEBUG)
 
+# How long to wait after the last keystroke in the search bar before searching, in milliseconds
+SEARCH_DEBOUNCE_MS = 150
+
 
 class GUI(tk.Tk):
     """
@@ -63,7 +67,7 @@ class GUI(tk.Tk):
         :return: None.
         """
         logger.debug("User requested closing window...")
-        if self.disable_closing:
+        if self.disable_closing or (hasattr(self, "job_queue") and self.job_queue.pending() + self.fleet_queue.pending() > 0):
             logger.warning("Currently in the middle of doing something!")
             if mbox.askokcancel("CircuitPython Bundle Manager: Confirmation",
                                 "Something is happening right now!\n"
@@ -147,7 +151,16 @@ class GUI(tk.Tk):
         self.version_listbox.set(self.load_key("last_circuit_python_bundle_version"))
         self.version_listbox.initiate_right_click_menu(disable=["Cut", "Delete"])
         tooltip.Hovertip(self.version_listbox, text="The major CircuitPython version used when updating the bundle.")
+        self.update_all_versions_var = tk.BooleanVar(value=bool(self.load_key("update_all_downloaded_versions")))
+        self.update_all_versions_checkbutton = ttk.Checkbutton(
+            master=self.github_auth_frame, text="Also update other downloaded versions",
+            variable=self.update_all_versions_var,
+            command=lambda: self.save_key("update_all_downloaded_versions", self.update_all_versions_var.get())
+        )
+        self.update_all_versions_checkbutton.grid(row=8, column=0, columnspan=3, padx=1, pady=1, sticky=tk.NW)
+        tooltip.Hovertip(self.update_all_versions_checkbutton, text="Whether to update the bundles of every version you have downloaded at the same time.")
         self.updating = False
+        self.updating_status = ""
         self.check_update_button()
 
     def try_updating_bundle_thread(self, event=None) -> None:
@@ -195,8 +208,36 @@ class GUI(tk.Tk):
         )
         try:
             logger.debug("Attempting to update bundle...")
-            bundle_manager.update_bundle(int(self.version_listbox.get()), github_instance)
-            mbox.showinfo("CircuitPython Bundle Manager: Info", "CircuitPython bundle updated successfully!")
+            versions = [int(self.version_listbox.get())]
+            if self.update_all_versions_var.get():
+                versions += [version for version in bundle_manager.list_downloaded_versions() if version not in versions]
+            if len(versions) == 1:
+                bundle_manager.update_bundle(versions[0], github_instance)
+                mbox.showinfo("CircuitPython Bundle Manager: Info", "CircuitPython bundle updated successfully!")
+            else:
+                statuses = {}
+
+                def update_status(version: int, status: str) -> None:
+                    statuses[version] = status
+                    self.updating_status = ", ".join(f"{v}.x: {s}" for v, s in sorted(statuses.items()))
+
+                results = bundle_manager.update_bundles(versions, github_instance, progress=update_status)
+                succeeded = [version for version, result in results.items() if not isinstance(result, Exception)]
+                failed = {version: result for version, result in results.items() if isinstance(result, Exception)}
+                if failed:
+                    mbox.showerror("CircuitPython Bundle Manager: ERROR!",
+                                   f"Failed to update the bundles for {len(failed)} of {len(versions)} versions!\n" +
+                                   "\n".join(f"{version}.x: {result}" for version, result in failed.items()) +
+                                   ("\n\nSuccessfully updated: " + ", ".join(f"{version}.x" for version in succeeded)
+                                    if succeeded else "") +
+                                   ("\n\n" + "\n\n".join("".join(traceback.format_exception(type(result), result,
+                                                                                          result.__traceback__))
+                                                          for result in failed.values())
+                                    if self.show_traceback() else ""))
+                else:
+                    mbox.showinfo("CircuitPython Bundle Manager: Info",
+                                  "CircuitPython bundles updated successfully for versions " +
+                                  ", ".join(f"{version}.x" for version in versions) + "!")
         except (TypeError, ValueError):
             logger.exception("Uh oh! Something happened!")
             mbox.showerror("CircuitPython Bundle Manager: ERROR!",
@@ -228,6 +269,7 @@ class GUI(tk.Tk):
         else:
             logger.info("Successfully updated bundle!")
         self.updating = False
+        self.updating_status = ""
         self.disable_closing = False
         self.enable_github_auth_inputs(True)
 
@@ -246,6 +288,7 @@ class GUI(tk.Tk):
         self.enterprise_radio_button.config(state=tk.NORMAL if enable else "disabled")
         self.version_label.config(state=tk.NORMAL if enable else "disabled")
         self.version_listbox.config(state=tk.NORMAL if enable else "disabled")
+        self.update_all_versions_checkbutton.config(state=tk.NORMAL if enable else "disabled")
 
     def check_update_button(self) -> None:
         """
@@ -257,7 +300,8 @@ class GUI(tk.Tk):
         """
         self.after(100, self.check_update_button)
         if self.updating:
-            self.update_bundle_button.config(state=tk.DISABLED, text="Updating bundle...")
+            self.update_bundle_button.config(state=tk.DISABLED, text="Updating bundle..." + (
+                f"\n{self.updating_status}" if self.updating_status else ""))
             return
         else:
             self.update_bundle_button.config(state="enabled", text="Update bundle")
@@ -461,8 +505,12 @@ class GUI(tk.Tk):
         self.bundle_manager_frame = ttk.Frame(master=self.notebook)
         self.bundle_manager_frame.grid(row=0, column=0, padx=1, pady=1)
         self.notebook.add(self.bundle_manager_frame, text="Bundle Manager")
-        self.installing = False
-        self.uninstalling = False
+        self.job_queue = jobs.JobQueue()
+        # Every device gets its own worker when provisioning many at once
+        self.fleet_queue = jobs.JobQueue(max_workers=fleet.MAX_WORKERS)
+        # Planning reads the device and waits for batches being written to it, so it never runs on the main thread
+        self.plan_queue = jobs.JobQueue()
+        self.job_batches = []
         self.create_bundle_list()
         self.create_installed_module_list()
         self.create_module_buttons()
@@ -476,6 +524,19 @@ class GUI(tk.Tk):
         :return: None.
         """
         try:
+            lib_path = modules.get_lib_path(Path(self.drive_combobox.get()))
+            # Check if the device was unplugged or reset in the middle of installing last time
+            if lib_path.exists() and not (self.job_queue.pending() or self.fleet_queue.pending() or
+                                           self.plan_queue.pending()):
+                try:
+                    recovered = device_writer.recover(lib_path)
+                except OSError:
+                    logger.exception("Uh oh! Something happened!")
+                    recovered = None
+                if recovered is not None:
+                    mbox.showwarning("CircuitPython Bundle Manager: Warning",
+                                     f"The last install or uninstall on {self.drive_combobox.get()} was interrupted, "
+                                     f"so it was {recovered}.")
             try:
                 installed_modules = modules.list_modules(Path(self.drive_combobox.get()))
             except RuntimeError:
@@ -492,26 +553,71 @@ class GUI(tk.Tk):
 
         :return: None.
         """
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+            self.search_after_id = None
         try:
             bundles = bundle_manager.list_modules_in_bundle(int(self.version_listbox.get()))
             if bundles == None:
                 bundles = []
-            bundles.sort()
-            logger.debug(f"Modules in bundle: {repr(bundles)}")
+            logger.debug(f"Modules in bundle: {len(bundles)}")
             search_query = self.search_bar_var.get()
-            if not search_query == "":
-                sorted_bundles = []
-                for bundle in bundles:
-                    if search_query in bundle:
-                        sorted_bundles.append(bundle)
-                logger.debug(f"Sorted bundles: {repr(sorted_bundles)}")
-                self.bundle_listbox_var.set(sorted_bundles)
-            else:
-                self.bundle_listbox_var.set(bundles)
+            same_bundle = bundles == self.bundles
+            results = search.search(search_query, bundles,
+                                    previous_query=self.last_search_query if same_bundle else None,
+                                    previous_results=self.last_search_results if same_bundle else None)
+            logger.debug(f"Search results: {len(results)}")
+            rows = results
+            if search_query.strip() != "":
+                # Also show the modules that only matched by their submodules, docstrings or metadata, after the rest
+                name_matches = set(results)
+                version = int(self.version_listbox.get())
+                rows = results + [name for name in bundle_manager.search_bundles(search_query, [version])[version]
+                                  if name not in name_matches]
+            self.update_bundle_listbox_rows(rows)
+            self.last_search_query = search_query
+            self.last_search_results = results
+            if not same_bundle:
+                self.bundle_positions = {name: position for position, name in enumerate(bundles)}
             self.bundles = bundles
         except (ValueError, AttributeError):
             logger.exception("Uh oh! Something happened!")
 
+    def update_bundle_listbox_rows(self, rows: list[str]) -> None:
+        """
+        Show rows in the bundle listbox, only deleting and inserting the rows that changed.
+
+        :param rows: A list of strings to show.
+        :return: None.
+        """
+        old_rows = self.shown_bundle_rows
+        if str(self.bundle_listbox["state"]) == tk.DISABLED:
+            # Disabled listboxes ignore inserts and deletes, but not changes to their list variable
+            self.bundle_listbox_var.set(rows)
+            self.shown_bundle_rows = list(rows)
+            return
+        start = 0
+        while start < len(old_rows) and start < len(rows) and old_rows[start] == rows[start]:
+            start += 1
+        end = 0
+        while end < len(old_rows) - start and end < len(rows) - start and old_rows[-end - 1] == rows[-end - 1]:
+            end += 1
+        if start + end < len(old_rows):
+            self.bundle_listbox.delete(start, len(old_rows) - end - 1)
+        if start + end < len(rows):
+            self.bundle_listbox.insert(start, *rows[start:len(rows) - end])
+        logger.debug(f"Replaced {len(old_rows) - start - end} rows with {len(rows) - start - end} rows at {start}")
+        self.shown_bundle_rows = list(rows)
+
+    def refresh_modules_in_bundle(self) -> None:
+        """
+        Reload the modules in the bundle from the disk, in case the bundles were changed outside of this program.
+
+        :return: None.
+        """
+        bundle_manager.clear_bundle_cache()
+        self.update_modules_in_bundle()
+
     def update_buttons(self) -> None:
         """
         Enable or disable the install/uninstall buttons.
@@ -519,6 +625,7 @@ class GUI(tk.Tk):
         :return: None
         """
         self.after(100, self.update_buttons)
+        self.check_job_batches()
         try:
             if self.updating:
                 self.install_module_button.config(state=tk.DISABLED, text="Updating bundle...\nCannot install!")
@@ -527,30 +634,10 @@ class GUI(tk.Tk):
                 self.install_module_button.config(text="Install")
         except AttributeError:
             logger.exception("Uh oh! Something happened!")
-        if self.installing:
-            self.install_module_button.config(state=tk.DISABLED, text="Installing...")
-            self.uninstall_module_button.config(state=tk.DISABLED)
-            self.bundle_listbox.config(state=tk.DISABLED)
-            self.installed_modules_listbox.config(state=tk.DISABLED)
-            self.search_bar.config(state=tk.DISABLED)
-            return
-        else:
-            self.install_module_button.config(text="Install")
-            self.bundle_listbox.config(state=tk.NORMAL)
-            self.installed_modules_listbox.config(state=tk.NORMAL)
-            self.search_bar.config(state=tk.NORMAL)
-        if self.uninstalling:
-            self.install_module_button.config(state=tk.DISABLED)
-            self.uninstall_module_button.config(state=tk.DISABLED, text="Uninstalling...")
-            self.bundle_listbox.config(state=tk.DISABLED)
-            self.installed_modules_listbox.config(state=tk.DISABLED)
-            self.search_bar.config(state=tk.DISABLED)
-            return
-        else:
-            self.uninstall_module_button.config(text="Uninstall")
-            self.bundle_listbox.config(state=tk.NORMAL)
-            self.installed_modules_listbox.config(state=tk.NORMAL)
-            self.search_bar.config(state=tk.NORMAL)
+        installing = self.job_queue.pending("install")
+        uninstalling = self.job_queue.pending("uninstall")
+        self.install_module_button.config(text=f"Install\n({installing} installing...)" if installing else "Install")
+        self.uninstall_module_button.config(text=f"Uninstall\n({uninstalling} uninstalling...)" if uninstalling else "Uninstall")
         self.install_module_button.config(state=tk.NORMAL if len(self.bundle_listbox.curselection()) > 0 else "disabled")
         self.uninstall_module_button.config(state=tk.NORMAL if len(self.installed_modules_listbox.curselection()) > 0 else "disabled")
         if self.drive_combobox.get() == "":
@@ -565,7 +652,9 @@ class GUI(tk.Tk):
         :return: None.
         """
         logger.debug(f"Search query is {repr(self.search_bar_var.get())}")
-        self.update_modules_in_bundle()
+        if self.search_after_id is not None:
+            self.after_cancel(self.search_after_id)
+        self.search_after_id = self.after(SEARCH_DEBOUNCE_MS, self.update_modules_in_bundle)
 
     def create_bundle_list(self) -> None:
         """
@@ -575,6 +664,12 @@ class GUI(tk.Tk):
         """
         self.bundle_listbox_frame = ttk.LabelFrame(master=self.bundle_manager_frame, text="Bundle")
         self.bundle_listbox_frame.grid(row=0, column=0, padx=1, pady=1, rowspan=3)
+        self.search_after_id = None
+        self.last_search_query = None
+        self.last_search_results = None
+        self.shown_bundle_rows = []
+        self.bundles = []
+        self.bundle_positions = {}
         self.search_bar_var = tk.StringVar()
         self.search_bar_var.set("")
         self.search_bar_var.trace_add("write", self.update_search_bar)
@@ -587,13 +682,13 @@ class GUI(tk.Tk):
         tooltip.Hovertip(self.search_bar, text="Enter your search query here.")
         self.bundle_listbox_var = tk.StringVar()
         if os_detect.on_windows():
-            self.bundle_listbox = ListboxWithRightClick(self.bundle_listbox_frame, width=19, height=9, listvariable=self.bundle_listbox_var)
+            self.bundle_listbox = ListboxWithRightClick(self.bundle_listbox_frame, width=19, height=9, listvariable=self.bundle_listbox_var, selectmode=tk.EXTENDED)
         else:
-            self.bundle_listbox = ListboxWithRightClick(self.bundle_listbox_frame, width=18, height=9, listvariable=self.bundle_listbox_var)
+            self.bundle_listbox = ListboxWithRightClick(self.bundle_listbox_frame, width=18, height=9, listvariable=self.bundle_listbox_var, selectmode=tk.EXTENDED)
         self.bundle_listbox.grid(row=1, column=0, padx=1, pady=1)
         self.bundle_listbox.initiate_right_click_menu(["Copy", "Cut", "Paste", "Select all", "Delete"])
         self.bundle_listbox.right_click_menu.add_separator()
-        self.bundle_listbox.right_click_menu.add_command(label="Refresh bundle", command=self.update_modules_in_bundle)
+        self.bundle_listbox.right_click_menu.add_command(label="Refresh bundle", command=self.refresh_modules_in_bundle)
         tooltip.Hovertip(self.bundle_listbox, text="A list of modules from the CircuitPython bundle.\n"
                                                    "Select a module and press install to install the module to the selected device.")
         self.bundle_listbox_scrollbar = ttk.Scrollbar(self.bundle_listbox_frame, orient=tk.VERTICAL, command=self.bundle_listbox.yview)
@@ -610,15 +705,22 @@ class GUI(tk.Tk):
         self.installed_modules_listbox_frame.grid(row=0, column=1, padx=1, pady=1, sticky=tk.NE)
         self.installed_modules_listbox_var = tk.StringVar()
         if os_detect.on_windows():
-            self.installed_modules_listbox = ListboxWithRightClick(self.installed_modules_listbox_frame, width=18, height=5, listvariable=self.installed_modules_listbox_var)
+            self.installed_modules_listbox = ListboxWithRightClick(self.installed_modules_listbox_frame, width=18, height=5, listvariable=self.installed_modules_listbox_var, selectmode=tk.EXTENDED)
         else:
-            self.installed_modules_listbox = ListboxWithRightClick(self.installed_modules_listbox_frame, width=17, height=5, listvariable=self.installed_modules_listbox_var)
+            self.installed_modules_listbox = ListboxWithRightClick(self.installed_modules_listbox_frame, width=17, height=5, listvariable=self.installed_modules_listbox_var, selectmode=tk.EXTENDED)
         self.installed_modules_listbox.grid(row=0, column=0, padx=1, pady=1)
         self.installed_modules_listbox.initiate_right_click_menu(["Copy", "Cut", "Paste", "Select all", "Delete"], callback=self.check_for_lib_path)
         self.installed_modules_listbox.right_click_menu.add_separator()
         self.installed_modules_listbox.right_click_menu.add_command(label="Refresh modules", command=self.update_modules_in_device)
         self.installed_modules_listbox.right_click_menu.add_command(label="Open in file manager",
                                                                     command=lambda: webbrowser.open(str(modules.get_lib_path(Path(self.drive_combobox.get())))))
+        self.installed_modules_listbox.right_click_menu.add_separator()
+        self.installed_modules_listbox.right_click_menu.add_command(label="Save as manifest...", command=self.save_device_manifest)
+        self.installed_modules_listbox.right_click_menu.add_command(label="Sync to manifest...", command=self.sync_device_to_manifest)
+        self.installed_modules_listbox.right_click_menu.add_command(label="Check for outdated modules...", command=self.check_for_outdated_modules)
+        self.installed_modules_listbox.right_click_menu.add_separator()
+        self.installed_modules_listbox.right_click_menu.add_command(label="Install selected on all devices", command=self.install_on_all_drives)
+        self.installed_modules_listbox.right_click_menu.add_command(label="Sync all devices to manifest...", command=self.sync_all_drives_to_manifest)
         tooltip.Hovertip(self.installed_modules_listbox, text="A list of modules installed on the selected device.\n"
                                                               "Select a module and press uninstall to uninstall the module from the selected device.")
         self.installed_modules_listbox_scrollbar = ttk.Scrollbar(self.installed_modules_listbox_frame, orient=tk.VERTICAL, command=self.installed_modules_listbox.yview)
@@ -631,115 +733,393 @@ class GUI(tk.Tk):
 
         :return: None.
         """
-        self.installed_modules_listbox.right_click_menu.delete(9)
-        self.installed_modules_listbox.right_click_menu.add_command(
-            label="Open in file manager",
-            state="normal" if modules.get_lib_path(Path(self.drive_combobox.get())).exists() else "disabled",
-            command=lambda: webbrowser.open(str(modules.get_lib_path(Path(self.drive_combobox.get()))))
-        )
+        state = "normal" if modules.get_lib_path(Path(self.drive_combobox.get())).exists() else "disabled"
+        for label in ("Open in file manager", "Save as manifest...", "Sync to manifest...", "Check for outdated modules..."):
+            self.installed_modules_listbox.right_click_menu.entryconfig(label, state=state)
 
-    def create_module_buttons(self) -> None:
+    def save_device_manifest(self) -> None:
         """
-        Create the install and uninstall buttons.
+        Save the modules installed on the selected device as a manifest, so other devices can be synced to it.
 
         :return: None.
         """
-        self.install_module_button = ttk.Button(self.bundle_manager_frame, text="Install", command=self.start_install_module_thread)
-        self.install_module_button.grid(row=1, column=1, padx=1, pady=1, sticky=tk.NSEW)
-        tooltip.Hovertip(self.install_module_button, text="Install the selected module to the selected device.")
-        self.uninstall_module_button = ttk.Button(self.bundle_manager_frame, text="Uninstall", command=self.start_uninstall_module_thread)
-        self.uninstall_module_button.grid(row=2, column=1, padx=1, pady=1, sticky=tk.NSEW)
-        tooltip.Hovertip(self.uninstall_module_button, text="Uninstall the selected module from the selected device.")
+        path = fd.asksaveasfilename(title="CircuitPython Bundle Manager: Save manifest", defaultextension=".json",
+                                    filetypes=(("Manifest", "*.json"), ("All files", "*.*")))
+        if not path:
+            return
+        try:
+            version = int(self.version_listbox.get())
+            bundle = bundle_manager.list_modules_in_bundle(version)
+            if bundle is None:
+                raise FileNotFoundError(f"No bundle was downloaded for version {version}!")
+            bundle = set(bundle)
+            installed = modules.list_modules(Path(self.drive_combobox.get()))
+            # Your own files in lib can't be synced from the bundle, so they are left out
+            names = [name for name in installed if name in bundle]
+            left_out = [name for name in installed if name not in bundle]
+            manifest.save_manifest(Path(path), version, names)
+        except (ValueError, RuntimeError, OSError):
+            logger.exception("Uh oh! Something happened!")
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!",
+                           "Failed to save the manifest - did you update the bundle for this version?\n\n" + (traceback.format_exc() if self.show_traceback() else ""))
+            return
+        if left_out:
+            mbox.showinfo("CircuitPython Bundle Manager: Info",
+                          f"Saved {len(names)} modules! These aren't in the bundle, so they were left out: "
+                          f"{', '.join(left_out)}")
 
-    def start_uninstall_module_thread(self) -> None:
+    def sync_device_to_manifest(self) -> None:
         """
-        Start the module uninstall thread.
+        Make the selected device match a manifest, only touching the modules that are different. The sync is planned and
+        runs in the background, see GUI.confirm_sync and GUI.check_job_batches.
 
         :return: None.
         """
-        logger.debug("Starting uninstall module thread!")
-        uninstall_thread = Thread(target=self.uninstall_module, daemon=True)
-        uninstall_thread.start()
+        path = fd.askopenfilename(title="CircuitPython Bundle Manager: Open manifest",
+                                  filetypes=(("Manifest", "*.json"), ("All files", "*.*")))
+        if not path:
+            return
+        drive = Path(self.drive_combobox.get())
+        try:
+            wanted = manifest.load_manifest(Path(path))
+        except (ValueError, OSError):
+            logger.exception("Uh oh! Something happened!")
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!",
+                           "Failed to read the manifest!\n\n" + (traceback.format_exc() if self.show_traceback() else ""))
+            return
+        self.plan_in_background(str(drive), lambda plan: self.confirm_sync(drive, plan),
+                                "Failed to plan the sync - did you update the bundle for the manifest's version?",
+                                manifest.plan_and_fit, wanted, drive)
 
-    def uninstall_module(self) -> None:
+    def confirm_sync(self, drive: Path, plan: dict) -> None:
         """
-        Uninstall the selected module from the selected device, this will block. Better to call
-        GUI.start_uninstall_module_thread instead.
+        Ask whether to sync a device to a manifest, and queue the sync. Called once the sync is planned.
+
+        :param drive: A pathlib.Path object that points to the device.
+        :param plan: A dictionary, as returned by "bundle_tools.manifest.plan_and_fit()".
+        :return: None.
+        """
+        if not (plan["add"] or plan["update"] or plan["remove"] or plan["dropped"]):
+            mbox.showinfo("CircuitPython Bundle Manager: Info", "The device already matches the manifest!")
+            return
+        if plan["dropped"]:
+            if not mbox.askyesno("CircuitPython Bundle Manager: Confirm",
+                                 "There isn't enough space on the device for the whole manifest!\n"
+                                 f"These won't fit: {', '.join(plan['dropped'])}\n\n"
+                                 f"Sync without them?"):
+                return
+        if not mbox.askokcancel("CircuitPython Bundle Manager: Confirm",
+                                f"Add: {', '.join(plan['add']) or 'nothing'}\n"
+                                f"Update: {', '.join(plan['update']) or 'nothing'}\n"
+                                f"Remove: {', '.join(plan['remove']) or 'nothing'}\n"
+                                f"({len(plan['unchanged'])} modules are already up to date)\n\n"
+                                f"Sync the device to the manifest?"):
+            return
+        self.job_batches.append([self.job_queue.submit(str(drive), "sync", manifest.apply_plan, plan, drive,
+                                                       dedupe=False)])
+
+    def check_for_outdated_modules(self) -> None:
+        """
+        Find the modules on the selected device that are older than the ones in the bundle, and offer to upgrade them
+        all at once. The check and the upgrade run in the background, see GUI.confirm_upgrade and
+        GUI.check_job_batches.
 
         :return: None.
         """
-        self.uninstalling = True
-        self.disable_closing = True
         drive = Path(self.drive_combobox.get())
-        logger.debug(f"Selected drive is {repr(drive)}")
         try:
-            module_path = modules.get_lib_path(drive) / self.installed_modules_listbox.get(self.installed_modules_listbox.curselection())
-            logger.debug(f"Attempting to uninstall module at {repr(module_path)}")
-            modules.uninstall_module(module_path)
-        except FileNotFoundError:
+            version = int(self.version_listbox.get())
+        except ValueError:
             logger.exception("Uh oh! Something happened!")
-            mbox.showerror("CircuitPython Bundle Manager: ERROR!",
-                           "Failed to uninstall module - did you input a drive that exists?\n"
-                           "Try reloading the list of installed modules before uninstall again!\n"
-                           "\n" + (traceback.format_exc() if self.show_traceback() else ""))
-        except RuntimeError:
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!", "Select a bundle version first!")
+            return
+        self.plan_in_background(str(drive), lambda found: self.confirm_upgrade(drive, version, found),
+                                "Failed to check for outdated modules - did you update the bundle for this version?",
+                                outdated.find_outdated, drive, version)
+
+    def confirm_upgrade(self, drive: Path, version: int, found: list[dict]) -> None:
+        """
+        Ask whether to upgrade the outdated modules on a device, and queue the upgrade. Called once the outdated modules
+        are found.
+
+        :param drive: A pathlib.Path object that points to the device.
+        :param version: An integer saying what bundle version to upgrade to.
+        :param found: A list of dictionaries, as returned by "bundle_tools.outdated.find_outdated()".
+        :return: None.
+        """
+        if not found:
+            mbox.showinfo("CircuitPython Bundle Manager: Info", "Every module on the device is up to date!")
+            return
+        if not mbox.askyesno("CircuitPython Bundle Manager: Confirm",
+                             f"{len(found)} modules are outdated:\n" +
+                             "\n".join(f"{module['name']}: {module['installed'] or '?'} -> {module['bundle'] or '?'}"
+                                        for module in found) +
+                             "\n\nUpgrade them all?"):
+            return
+        self.job_batches.append([self.job_queue.submit(str(drive), "sync", outdated.upgrade_all, drive, version,
+                                                       [module["name"] for module in found], dedupe=False)])
+
+    def queue_fleet(self, wanted: dict, remove_extra: bool) -> None:
+        """
+        Plan provisioning every connected CircuitPython device in the background, then show what will change on each one
+        before writing anything. See GUI.confirm_fleet.
+
+        :param wanted: A dictionary like a manifest, see "bundle_tools.manifest.load_manifest()".
+        :param remove_extra: A bool telling whether to remove modules in the bundle that aren't in the manifest.
+        :return: None.
+        """
+        try:
+            connected_drives = drives.list_connected_drives(True, Path(self.load_key("unix_drive_mount_point")))
+        except OSError:
             logger.exception("Uh oh! Something happened!")
             mbox.showerror("CircuitPython Bundle Manager: ERROR!",
-                           "Failed to uninstall module!\n\n" + (traceback.format_exc() if self.show_traceback() else ""))
-        else:
-            logger.debug("Successfully uninstalled module!")
-            mbox.showinfo("CircuitPython Bundle Manager: Info", "Successfully uninstalled module!")
-        self.uninstalling = False
-        self.disable_closing = False
-        self.after(100, self.update_modules_in_device)
+                           "Oh no! An error occurred while getting a list of connected drives!\n\n" + (traceback.format_exc() if self.show_traceback() else ""))
+            return
+        if not connected_drives:
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!", "No CircuitPython devices are connected!")
+            return
+        self.plan_in_background("fleet", lambda plans: self.confirm_fleet(plans, remove_extra),
+                                "Failed to plan the devices - did you update the bundle for this version?",
+                                fleet.plan_drives, connected_drives, wanted, remove_extra)
 
-    def start_install_module_thread(self) -> None:
+    def confirm_fleet(self, plans: dict, remove_extra: bool) -> None:
         """
-        Start the module install thread.
+        Show what will change on every device, and queue writing to them all at the same time with one worker per
+        device. Each device is reported on its own, see GUI.check_job_batches.
 
+        :param plans: A dictionary, as returned by "bundle_tools.fleet.plan_drives()".
+        :param remove_extra: A bool telling whether the plans remove modules.
         :return: None.
         """
-        logger.debug("Starting install module thread!")
-        install_thread = Thread(target=self.install_module, daemon=True)
-        install_thread.start()
+        changes = []
+        to_write = {}
+        for drive, plan in plans.items():
+            if isinstance(plan, Exception):
+                changes.append(f"{drive}: skipped, {plan}")
+                continue
+            if not (plan["add"] or plan["update"] or plan["remove"]):
+                changes.append(f"{drive}: already up to date" +
+                               (f", {', '.join(plan['dropped'])} won't fit" if plan["dropped"] else ""))
+                continue
+            to_write[drive] = plan
+            changes.append(f"{drive}: add {', '.join(plan['add']) or 'nothing'}; "
+                           f"update {', '.join(plan['update']) or 'nothing'}; "
+                           f"remove {', '.join(plan['remove']) or 'nothing'}" +
+                           (f"; {', '.join(plan['dropped'])} won't fit" if plan["dropped"] else ""))
+        if not to_write:
+            mbox.showinfo("CircuitPython Bundle Manager: Info", "Nothing to do!\n" + "\n".join(changes))
+            return
+        if not mbox.askokcancel("CircuitPython Bundle Manager: Confirm",
+                                f"{'Sync' if remove_extra else 'Install on'} {len(to_write)} of {len(plans)} "
+                                f"devices?\n" + "\n".join(changes)):
+            return
+        logger.debug(f"Provisioning {repr(list(to_write))}")
+        self.job_batches.append([self.fleet_queue.submit(str(drive), "sync", manifest.apply_plan, plan, drive,
+                                                         dedupe=False)
+                                 for drive, plan in to_write.items()])
 
-    def install_module(self) -> None:
+    def install_on_all_drives(self) -> None:
         """
-        Install the selected module to the selected device, this will block. Better to call
-        GUI.start_install_module_thread instead.
+        Install (or upgrade) the selected modules on every connected CircuitPython device.
 
         :return: None.
         """
-        self.installing = True
-        self.disable_closing = True
+        selected = [self.bundle_listbox.get(index) for index in self.bundle_listbox.curselection()]
+        if not selected:
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!", "Select the modules to install in the bundle first!")
+            return
         try:
-            bundle_path = bundle_manager.get_bundle_path(int(self.version_listbox.get()))
-            logger.debug(f"Attempting to install module at {repr(bundle_path)}")
-            selected = self.bundle_listbox.get(self.bundle_listbox.curselection())
-            logger.debug(f"Selected in listbox is {repr(selected)}")
-            logger.debug(f"Installing module {repr(selected)}")
-            modules.install_module(
-                bundle_path / selected,
-                Path(self.drive_combobox.get()) / "lib"
-            )
-        except FileExistsError:
+            version = int(self.version_listbox.get())
+        except ValueError:
             logger.exception("Uh oh! Something happened!")
-            mbox.showerror("CircuitPython Bundle Manager: ERROR!",
-                           "Failed to install module - did you already install the module?\n\n" + (traceback.format_exc() if self.show_traceback() else ""))
-        except FileNotFoundError:
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!", "Select a bundle version first!")
+            return
+        self.queue_fleet({"version": version, "modules": selected}, remove_extra=False)
+
+    def sync_all_drives_to_manifest(self) -> None:
+        """
+        Make every connected CircuitPython device match a manifest.
+
+        :return: None.
+        """
+        path = fd.askopenfilename(title="CircuitPython Bundle Manager: Open manifest",
+                                  filetypes=(("Manifest", "*.json"), ("All files", "*.*")))
+        if not path:
+            return
+        try:
+            wanted = manifest.load_manifest(Path(path))
+        except (ValueError, OSError):
             logger.exception("Uh oh! Something happened!")
             mbox.showerror("CircuitPython Bundle Manager: ERROR!",
-                           "Failed to install module - did you input a drive that exists?\n\n" + (traceback.format_exc() if self.show_traceback() else ""))
-        except RuntimeError:
+                           "Failed to read the manifest!\n\n" + (traceback.format_exc() if self.show_traceback() else ""))
+            return
+        self.queue_fleet(wanted, remove_extra=True)
+
+    def create_module_buttons(self) -> None:
+        """
+        Create the install and uninstall buttons.
+
+        :return: None.
+        """
+        self.install_module_button = ttk.Button(self.bundle_manager_frame, text="Install", command=self.queue_install_modules)
+        self.install_module_button.grid(row=1, column=1, padx=1, pady=1, sticky=tk.NSEW)
+        tooltip.Hovertip(self.install_module_button, text="Install the selected modules to the selected device.")
+        self.uninstall_module_button = ttk.Button(self.bundle_manager_frame, text="Uninstall", command=self.queue_uninstall_modules)
+        self.uninstall_module_button.grid(row=2, column=1, padx=1, pady=1, sticky=tk.NSEW)
+        tooltip.Hovertip(self.uninstall_module_button, text="Uninstall the selected modules from the selected device.")
+
+    def queue_uninstall_modules(self) -> None:
+        """
+        Queue uninstalling the selected modules from the selected device. The uninstalls run in the background, see
+        GUI.check_job_batches.
+
+        :return: None.
+        """
+        drive = Path(self.drive_combobox.get())
+        logger.debug(f"Selected drive is {repr(drive)}")
+        lib_path = modules.get_lib_path(drive)
+        selected = [self.installed_modules_listbox.get(index) for index in self.installed_modules_listbox.curselection()]
+        logger.debug(f"Queueing uninstall of {repr(selected)}")
+        batch = [self.job_queue.submit(name, "uninstall", modules.uninstall_module, lib_path / name) for name in selected]
+        self.job_batches.append(batch)
+
+    def queue_install_modules(self) -> None:
+        """
+        Queue installing the selected modules and the modules they need to the selected device. The install is planned
+        and written in one batch in the background, dependencies first, see GUI.confirm_install and
+        GUI.check_job_batches.
+
+        :return: None.
+        """
+        drive = Path(self.drive_combobox.get())
+        selected = [self.bundle_listbox.get(index) for index in self.bundle_listbox.curselection()]
+        logger.debug(f"Selected in listbox is {repr(selected)}")
+        if not modules.get_lib_path(drive).exists():
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!",
+                           "Failed to install module - did you input a drive that exists?")
+            return
+        try:
+            version = int(self.version_listbox.get())
+        except ValueError:
             logger.exception("Uh oh! Something happened!")
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!", "Select a bundle version first!")
+            return
+        # Selected modules are updated, dependencies that are already on the device are left alone. Dependencies come
+        # first, so they are the last to be dropped if everything doesn't fit
+        self.plan_in_background(f"{drive} ({', '.join(selected)})",
+                                lambda plan: self.confirm_install(drive, selected, plan),
+                                "Failed to install module - did you update the bundle for this version?",
+                                manifest.plan_and_fit, {"version": version, "modules": selected}, drive,
+                                remove_extra=False, keep_installed=True)
+
+    def confirm_install(self, drive: Path, selected: list[str], plan: dict) -> None:
+        """
+        Queue an install once it is planned, asking first if not everything fits.
+
+        :param drive: A pathlib.Path object that points to the device.
+        :param selected: A list of strings with the names of the selected modules.
+        :param plan: A dictionary, as returned by "bundle_tools.manifest.plan_and_fit()".
+        :return: None.
+        """
+        if not plan["files"] and not plan["remove"] and not plan["dropped"]:
+            mbox.showinfo("CircuitPython Bundle Manager: Info", "Already up to date: " + ", ".join(selected))
+            return
+        if plan["dropped"]:
+            if not plan["files"]:
+                mbox.showerror("CircuitPython Bundle Manager: ERROR!",
+                               "There isn't enough space on the device for any of the selected modules!")
+                return
+            if not mbox.askyesno("CircuitPython Bundle Manager: Confirm",
+                                 "There isn't enough space on the device for all of the modules!\n"
+                                 f"These won't fit: {', '.join(plan['dropped'])}\n\n"
+                                 f"Install just {', '.join(plan['files'])}?"):
+                return
+        job = self.job_queue.submit(f"{drive} ({', '.join(selected)})", "install", manifest.apply_plan, plan, drive,
+                                    dedupe=False)
+        logger.debug(f"Queued install of {repr(job)}")
+        self.job_batches.append([job])
+
+    def plan_in_background(self, name: str, on_planned: Callable, error_message: str, function: Callable, *args,
+                           **kwargs) -> None:
+        """
+        Run something that reads a device, like planning a sync, on a worker so the window doesn't freeze while the
+        device is busy. See GUI.check_plan_job.
+
+        :param name: A string with what is being planned, like the drive.
+        :param on_planned: A function that is called on the main thread with what the function returned.
+        :param error_message: A string to show if the function fails.
+        :param function: The function to run in the background.
+        :param args: Arguments to pass to the function.
+        :param kwargs: Keyword arguments to pass to the function.
+        :return: None.
+        """
+        job = self.plan_queue.submit(name, "plan", function, *args, dedupe=False, **kwargs)
+        self.after(100, self.check_plan_job, job, on_planned, error_message)
+
+    def check_plan_job(self, job: jobs.Job, on_planned: Callable, error_message: str) -> None:
+        """
+        Wait for a job from GUI.plan_in_background to finish, then hand over what it returned or show the error.
+
+        :param job: The Job.
+        :param on_planned: A function that is called with the result of the job.
+        :param error_message: A string to show if the job failed.
+        :return: None.
+        """
+        if not job.finished:
+            self.after(100, self.check_plan_job, job, on_planned, error_message)
+            return
+        if job.error is not None:
             mbox.showerror("CircuitPython Bundle Manager: ERROR!",
-                           "Failed to install module!\n\n" + (traceback.format_exc() if self.show_traceback() else ""))
-        else:
-            logger.debug("Successfully installed module!")
-            mbox.showinfo("CircuitPython Bundle Manager: Info", "Successfully installed module!")
-        self.installing = False
-        self.disable_closing = False
-        self.after(100, self.update_modules_in_device)
+                           error_message + "\n\n" +
+                           ("".join(traceback.format_exception(type(job.error), job.error, job.error.__traceback__))
+                            if self.show_traceback() else ""))
+            return
+        on_planned(job.result)
+
+    def check_job_batches(self) -> None:
+        """
+        Report the install, uninstall and sync batches that finished. Called by GUI.update_buttons.
+
+        :return: None.
+        """
+        for batch in list(self.job_batches):
+            if not all(job.finished for job in batch):
+                continue
+            self.job_batches.remove(batch)
+            self.after(100, self.update_modules_in_device)
+            if not batch:
+                continue
+            action = batch[0].action
+            # Installs and syncs are done per device, uninstalls per module
+            noun = "device" if action in ("install", "sync") else "module"
+            failed = [job for job in batch if job.error is not None]
+            succeeded = [job for job in batch if job.error is None]
+            if action in ("install", "sync"):
+                # Syncs return the plan they applied, so say what happened to each module on each device
+                done = "\n".join(f"{job.name}: " + ("; ".join(f"{verb} {', '.join(job.result[key])}"
+                                                               for verb, key in (("added", "add"), ("updated", "update"),
+                                                                                 ("removed", "remove"))
+                                                               if job.result[key]) or "nothing changed")
+                                 for job in succeeded)
+            else:
+                done = ", ".join(job.name for job in succeeded)
+            if failed:
+                reasons = []
+                for job in failed:
+                    if isinstance(job.error, FileNotFoundError):
+                        reason = "did you input a drive that exists?"
+                    else:
+                        reason = str(job.error)
+                    reasons.append(f"{job.name}: {reason}")
+                mbox.showerror("CircuitPython Bundle Manager: ERROR!",
+                               f"Failed to {action} {len(failed)} of {len(batch)} {noun}s!\n" + "\n".join(reasons) +
+                               (f"\n\nSuccessfully {action}ed:\n" + done if succeeded else "") +
+                               ("\n\n" + "\n".join(f"{job.name}: {repr(job.error)}" for job in failed) if self.show_traceback() else ""))
+            else:
+                logger.debug(f"Successfully {action}ed {len(batch)} {noun}s!")
+                mbox.showinfo("CircuitPython Bundle Manager: Info",
+                              f"Successfully {action}ed " + (f"{noun}!" if len(batch) == 1 else f"{len(batch)} {noun}s!") +
+                              "\n" + done)
 
     def create_drive_selector(self) -> None:
         """
@@ -779,6 +1159,7 @@ class GUI(tk.Tk):
         :return: None.
         """
         self.update_drives()
+        bundle_manager.clear_bundle_cache()
         self.update_modules()
 
     def update_modules(self) -> None:
@@ -1092,6 +1473,10 @@ class GUI(tk.Tk):
             self.save_key("show_traceback_in_error_messages", False)
         if not self.load_key("unix_drive_mount_point"):
             self.save_key("unix_drive_mount_point", "/media")
+        if self.load_key("download_retries") is None:
+            self.save_key("download_retries", network.RETRIES)
+        if self.load_key("download_backoff_factor") is None:
+            self.save_key("download_backoff_factor", network.BACKOFF_FACTOR)
 
     def get_code(self) -> Union[Path, None]:
         """
@@ -1117,6 +1502,8 @@ class GUI(tk.Tk):
         self.after(ms=100, func=self.update_detect_button)
         enable = not (not self.drive_combobox.get() or not Path(self.drive_combobox.get()).exists() or not self.get_code())
         self.detect_refresh_button.config(state=tk.NORMAL if enable else tk.DISABLED)
+        if hasattr(self, "detect_install_missing_button"):
+            self.detect_install_missing_button.config(state=tk.NORMAL if enable and not self.updating else tk.DISABLED)
         if hasattr(self, "detected_modules_listbox_var") and not enable:
             self.detected_modules_listbox_var.set([])
 
@@ -1146,11 +1533,68 @@ class GUI(tk.Tk):
         code_path = self.get_code()
         if not code_path:
             return
-        self.modules_imported, self.module_lines = imported.get_imported(code_path.read_text())
-        self.modules_imported = list(set([module.split(".")[0] for module in self.modules_imported]))
+        drive = Path(self.drive_combobox.get())
+        entry_points = [code_path] + [path for path in (drive / "boot.py",) if path.exists()]
+        try:
+            version = int(self.version_listbox.get())
+        except ValueError:
+            version = None
+        try:
+            # Modules built into the firmware on the device are left out, they never come from the bundle
+            self.modules_imported = missing.detect_imported(drive, entry_points, version)
+        except OSError:
+            logger.exception("Uh oh! Something happened!")
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!",
+                           "Failed to read the code on the device!\n\n" + (traceback.format_exc() if self.show_traceback() else ""))
+            return
         logger.debug(f"Modules imported: {repr(self.modules_imported)}")
         self.detected_modules_listbox_var.set(self.modules_imported)
 
+    def install_missing_modules(self) -> None:
+        """
+        Detect the modules the code needs and install the ones that aren't on the device yet in one batch. The install
+        is planned and runs in the background, see GUI.confirm_install_missing and GUI.check_job_batches.
+
+        :return: None.
+        """
+        self.update_detect()
+        if not hasattr(self, "modules_imported"):
+            return
+        drive = Path(self.drive_combobox.get())
+        try:
+            version = int(self.version_listbox.get())
+        except ValueError:
+            logger.exception("Uh oh! Something happened!")
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!", "Select a bundle version first!")
+            return
+        self.plan_in_background(str(drive), lambda plan: self.confirm_install_missing(drive, plan),
+                                "Failed to work out the missing modules - did you update the bundle for this version?",
+                                missing.plan_missing, drive, version, self.modules_imported)
+
+    def confirm_install_missing(self, drive: Path, plan: dict) -> None:
+        """
+        Ask whether to install the missing modules on a device, and queue the install. Called once the install is
+        planned.
+
+        :param drive: A pathlib.Path object that points to the device.
+        :param plan: A dictionary, as returned by "bundle_tools.missing.plan_missing()".
+        :return: None.
+        """
+        unknown = f"\n\nNot in the bundle: {', '.join(plan['unknown'])}" if plan["unknown"] else ""
+        if not plan["add"] and not plan["dropped"]:
+            mbox.showinfo("CircuitPython Bundle Manager: Info", "Every module the code needs is already installed!" + unknown)
+            return
+        too_big = f"\n\nThese won't fit on the device: {', '.join(plan['dropped'])}" if plan["dropped"] else ""
+        if not plan["add"]:
+            mbox.showerror("CircuitPython Bundle Manager: ERROR!",
+                           "There isn't enough space on the device for any of the missing modules!" + unknown)
+            return
+        if not mbox.askokcancel("CircuitPython Bundle Manager: Confirm",
+                                f"Install {', '.join(plan['add'])}?" + too_big + unknown):
+            return
+        self.job_batches.append([self.job_queue.submit(str(drive), "sync", manifest.apply_plan, plan, drive,
+                                                       dedupe=False)])
+
     def update_find_in_bundle_button(self) -> None:
         """
         Update the find in bundle button depending on the current situation.
@@ -1165,13 +1609,24 @@ class GUI(tk.Tk):
         if not self.detected_modules_listbox.curselection():
             return
         selected = self.detected_modules_listbox.get(self.detected_modules_listbox.curselection())
-        if selected in self.bundles:
-            self.detect_find_in_bundle_button.config(state=tk.NORMAL)
-        elif f"{selected}.mpy" in self.bundles:
+        if self.resolve_detected_module(selected) in self.bundle_positions:
             self.detect_find_in_bundle_button.config(state=tk.NORMAL)
         else:
             self.detect_find_in_bundle_button.config(state=tk.DISABLED)
 
+    def resolve_detected_module(self, name: str) -> Union[str, None]:
+        """
+        Get the module in the bundle that a detected module comes from.
+
+        :param name: A string with the detected module, like "neopixel".
+        :return: A string with the name of the module in the bundle, like "neopixel.mpy", or None if it isn't in the
+          bundle.
+        """
+        try:
+            return bundle_manager.resolve_import(int(self.version_listbox.get()), name)
+        except ValueError:
+            return None
+
     def find_in_bundle(self) -> None:
         """
         Find the selected module in the list of detected modules in the bundle.
@@ -1180,14 +1635,12 @@ class GUI(tk.Tk):
         """
         selected = self.detected_modules_listbox.get(self.detected_modules_listbox.curselection())
         self.search_bar_var.set("")
+        self.update_modules_in_bundle()
         self.bundle_listbox.selection_clear(0, tk.END)
-        if selected in self.bundles:
-            self.bundle_listbox.selection_set(self.bundles.index(selected))
-            self.bundle_listbox.see(self.bundles.index(selected))
-        selected = f"{selected}.mpy"
-        if selected in self.bundles:
-            self.bundle_listbox.selection_set(self.bundles.index(selected))
-            self.bundle_listbox.see(self.bundles.index(selected))
+        position = self.bundle_positions.get(self.resolve_detected_module(selected))
+        if position is not None:
+            self.bundle_listbox.selection_set(position)
+            self.bundle_listbox.see(position)
         self.notebook.select(self.bundle_manager_frame)
 
     def create_detect_top_ui(self) -> None:
@@ -1205,6 +1658,11 @@ class GUI(tk.Tk):
                                                        command=self.find_in_bundle, state=tk.DISABLED)
         self.detect_find_in_bundle_button.grid(row=0, column=1, padx=1, pady=1, sticky=tk.NW)
         tooltip.Hovertip(self.detect_find_in_bundle_button, text="Find the selected module in the bundle list.")
+        self.detect_install_missing_button = ttk.Button(master=self.detect_top_frame, text="Install missing",
+                                                        command=self.install_missing_modules, state=tk.DISABLED)
+        self.detect_install_missing_button.grid(row=0, column=2, padx=1, pady=1, sticky=tk.NW)
+        tooltip.Hovertip(self.detect_install_missing_button, text="Install every module the code needs that isn't on the "
+                                                                  "device yet, along with the modules they need.")
         self.update_detect_button()
         self.update_find_in_bundle_button()
 
@@ -1271,6 +1729,8 @@ class GUI(tk.Tk):
         self.notebook = ttk.Notebook(master=self)
         self.notebook.grid(row=0, column=0, padx=1, pady=1, columnspan=4, sticky=tk.N)
         self.create_config()
+        network.configure_session(retries=int(self.load_key("download_retries")),
+                                  backoff_factor=float(self.load_key("download_backoff_factor")))
         self.create_drive_selector()
         self.create_bundle_update_tab()
         self.create_bundle_manager_tab()
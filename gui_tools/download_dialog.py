@@ -23,6 +23,8 @@ from tkinter import messagebox as mbox
 from pathlib import Path
 import requests
 import traceback
+from typing import Union
+from bundle_tools import network
 from bundle_tools.create_logger import create_logger
 import logging
 
@@ -51,27 +53,21 @@ def download_file(status_widget: ttk.Label, url: str, path: Path) -> None:
     :return: None.
     """
     logger.debug(f"Downloading {repr(url)} to {repr(path)}")
-    req = requests.get(url=url, stream=True)
-    total_length = req.headers.get("content-length")
-    logger.debug(f"Length of data is {repr(total_length)}")
-    data_length = 0
-    if total_length is None:
-        path.write_bytes(req.content)
-    else:
-        with path.open(mode="wb") as file:
-            file.seek(0)
-            for chunk in req.iter_content(1024):
-                data_length += len(chunk)
-                logger.debug(f"Length of data currently is {data_length}")
-                file.write(chunk)
-                text = f"{round(data_length / 1024, 2)}/{round(int(total_length) / 1024, 2)} kB"
-                logger.debug(f"Updated: {text}")
-                status_widget.config(text=text)
-                status_widget.update_idletasks()
-            text = f"Wrote {round(int(total_length) / 1024, 2)} kB"
-            logger.debug(f"Updated: {text}")
-            status_widget.config(text=text)
-            status_widget.update_idletasks()
+
+    def update_status(data_length: int, total_length: Union[int, None]) -> None:
+        total_text = round(total_length / 1024, 2) if total_length is not None else "infinity"
+        text = f"{round(data_length / 1024, 2)}/{total_text} kB"
+        logger.debug(f"Updated: {text}")
+        status_widget.config(text=text)
+        status_widget.update_idletasks()
+
+    part_path = path.with_name(path.name + ".part")
+    result = network.stream_to_file(url, part_path, progress=update_status)
+    part_path.replace(path)
+    text = f"Wrote {round(result['size'] / 1024, 2)} kB"
+    logger.debug(f"Updated: {text}")
+    status_widget.config(text=text)
+    status_widget.update_idletasks()
 
 
 def download(master: tk.Tk, url: str, path: Path, show_traceback: bool = False) -> bool: